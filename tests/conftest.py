@@ -0,0 +1,58 @@
+import os
+
+import pytest
+from whoosh.fields import Schema, ID, TEXT
+from whoosh.index import create_in
+
+
+"""
+This .py file contains the fixtures shared by the tests.
+The app is configured against an in-memory SQLite database, never the database configured for deployment,
+and runs from an empty directory so the search indexes, logs and input data of the repo are never touched.
+"""
+
+
+os.environ["SECRET_KEY"] = "test"
+os.environ["AWS_DATABASE_URI"] = "sqlite://"
+# mail.cfg holds the deployment mail credentials and is not part of the repo
+os.environ["MAIL_CONFIG"] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mail.cfg")
+
+
+@pytest.fixture(scope="session")
+def workdir(tmp_path_factory):
+    """
+    Run the tests from an empty directory holding empty search indexes.
+    Importing the app opens the indexes, and would otherwise build them from tables that do not exist yet
+    """
+    path = tmp_path_factory.mktemp("utreview")
+    cwd = os.getcwd()
+    os.chdir(path)
+
+    for ix_dir in ("utreview/index/course", "utreview/index/prof"):
+        os.makedirs(ix_dir)
+        create_in(ix_dir, Schema(index=ID(stored=True, unique=True), content=TEXT))
+
+    yield path
+    os.chdir(cwd)
+
+
+@pytest.fixture
+def app(workdir):
+    """
+    Get the app with empty tables, dropped again after the test
+    """
+    from utreview import app, db
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    """
+    Get a test client of the app
+    """
+    return app.test_client()
@@ -0,0 +1,53 @@
+import os
+import sqlite3
+
+import pytest
+
+
+"""
+This .py file contains the checks of the prof keys grade distributions are looked up by.
+"""
+
+
+AGG_COLUMNS = ['sem', 'dept', 'course_nbr', 'course_name', 'prof', 'section']
+
+
+@pytest.fixture
+def grade_store(app, tmp_path):
+    """
+    Build the grade store from a grades.db of two profs sharing a last name and the first word of their first name
+    """
+    from utreview.services.grade_store import GRADE_KEYS, GRADE_STORE, ingest_grades
+
+    src = str(tmp_path / "grades.db")
+    conn = sqlite3.connect(src)
+    conn.execute(f"CREATE TABLE agg ({', '.join(AGG_COLUMNS + [f'g{i}' for i in range(len(GRADE_KEYS))])})")
+    conn.executemany(f"INSERT INTO agg VALUES ({', '.join(['?'] * (len(AGG_COLUMNS) + len(GRADE_KEYS)))})", [
+        ("Aggregate", "C S", "314", "DATA STRUCTURES", "BERG, JOHN", None, 10) + (0,) * 11,
+        ("Aggregate", "C S", "314", "DATA STRUCTURES", "BERG, JOHN PAUL", None, 0, 0, 0, 20) + (0,) * 8,
+    ])
+    conn.commit()
+    conn.close()
+
+    os.makedirs(os.path.dirname(GRADE_STORE), exist_ok=True)
+    ingest_grades(src, GRADE_STORE)
+    yield
+    os.remove(GRADE_STORE)
+
+
+def test_prof_key_keeps_whole_first_name(app):
+    from utreview.services.grade_store import agg_prof_key, prof_key
+
+    assert prof_key("John", "Berg") == "BERG, JOHN"
+    assert prof_key("John Paul", "Van Berg") == "BERG, JOHN PAUL"
+    assert agg_prof_key("BERG, JOHN PAUL") == prof_key("John Paul", "Berg")
+    assert prof_key("John", "Berg") != prof_key("John Paul", "Berg")
+
+
+def test_profs_sharing_first_word_do_not_share_grades(grade_store):
+    from utreview.services.grade_store import course_prof_grades_batch
+
+    john, john_paul = course_prof_grades_batch([("C S", "314", "John", "Berg"), ("C S", "314", "John Paul", "Berg")])
+
+    assert john['A'] == 10 and john['B'] == 0
+    assert john_paul['A'] == 0 and john_paul['B'] == 20
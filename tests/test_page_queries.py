@@ -0,0 +1,183 @@
+import datetime
+
+import pytest
+from sqlalchemy import event
+
+
+"""
+This .py file contains the query count checks of the course and prof details pages.
+Both pages load with a fixed set of queries, so the number of queries must not grow with the number of reviews
+or with the number of courses taught by the prof.
+"""
+
+
+VIEWER_EMAIL = "viewer@utexas.edu"
+
+
+class QueryCounter:
+    """
+    Class counting the statements sent to the database while it is active
+    """
+
+    def __init__(self, engine):
+        """
+        initialize a counter on an engine
+        :param engine: engine to count the statements of
+        :type engine: sqlalchemy.engine.Engine
+        """
+        self.engine = engine
+        self.count = 0
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self.before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self.before_cursor_execute)
+
+
+@pytest.fixture
+def page_data(app):
+    """
+    Add a course taught by a prof, a semester and the viewer, returning the ids the pages are requested with
+    """
+    from utreview import db
+    from utreview.models import Course, Dept, ProfCourse, Prof, ProfilePic, Semester, User
+
+    dept = Dept(abr="C S", name="Computer Science")
+    pic = ProfilePic(file_name="default.png")
+    db.session.add_all([dept, pic])
+    db.session.flush()
+
+    course = Course(num="314", title="DATA STRUCTURES", dept_id=dept.id)
+    prof = Prof(first_name="Mike", last_name="Scott")
+    semester = Semester(year=2020, semester=9)
+    viewer = User(first_name="View", last_name="Er", email=VIEWER_EMAIL, verified=True,
+                  major_id=dept.id, profile_pic_id=pic.id)
+    db.session.add_all([course, prof, semester, viewer])
+    db.session.flush()
+
+    db.session.add(ProfCourse(prof_id=prof.id, course_id=course.id))
+    db.session.commit()
+
+    return {'course_id': course.id, 'prof_id': prof.id, 'sem_id': semester.id, 'dept_id': dept.id,
+            'pic_id': pic.id, 'viewer_id': viewer.id, 'num_reviews': 0, 'num_courses': 0}
+
+
+def add_courses(page_data, num_courses):
+    """
+    Add courses of new depts taught by the prof
+    :param page_data: ids returned by the page_data fixture
+    :type page_data: dict
+    :param num_courses: number of courses to add
+    :type num_courses: int
+    """
+    from utreview import db
+    from utreview.models import Course, Dept, ProfCourse
+
+    for _ in range(num_courses):
+        page_data['num_courses'] += 1
+        i = page_data['num_courses']
+
+        dept = Dept(abr=f"D{i}", name=f"Dept {i}")
+        db.session.add(dept)
+        db.session.flush()
+
+        course = Course(num=str(300 + i), title=f"TOPICS {i}", dept_id=dept.id)
+        db.session.add(course)
+        db.session.flush()
+
+        db.session.add(ProfCourse(prof_id=page_data['prof_id'], course_id=course.id))
+
+    db.session.commit()
+
+
+def add_reviews(page_data, num_reviews):
+    """
+    Add reviews of the course and prof by new users, each liked by the viewer
+    :param page_data: ids returned by the page_data fixture
+    :type page_data: dict
+    :param num_reviews: number of reviews to add
+    :type num_reviews: int
+    """
+    from utreview import db
+    from utreview.models import CourseReview, CourseReviewLiked, ProfReview, ProfReviewLiked, Review, User
+
+    for _ in range(num_reviews):
+        page_data['num_reviews'] += 1
+        i = page_data['num_reviews']
+
+        user = User(first_name="User", last_name=str(i), email=f"user{i}@utexas.edu", verified=True,
+                    major_id=page_data['dept_id'], profile_pic_id=page_data['pic_id'])
+        db.session.add(user)
+        db.session.flush()
+
+        date_posted = datetime.datetime(2020, 9, 1) + datetime.timedelta(days=i)
+        review = Review(user_id=user.id, sem_id=page_data['sem_id'], grade="A", anonymous=False,
+                        submitted=True, date_posted=date_posted)
+        db.session.add(review)
+        db.session.flush()
+
+        course_review = CourseReview(review_id=review.id, course_id=page_data['course_id'], approval=True,
+                                     usefulness=4, difficulty=3, workload=3, comments=f"course review {i}",
+                                     date_posted=date_posted,
+                                     num_liked=1)
+        prof_review = ProfReview(review_id=review.id, prof_id=page_data['prof_id'], approval=True,
+                                 clear=4, engaging=4, grading=4, comments=f"prof review {i}", date_posted=date_posted,
+                                 num_liked=1)
+        db.session.add_all([course_review, prof_review])
+        db.session.flush()
+
+        db.session.add(CourseReviewLiked(course_review_id=course_review.id, user_id=page_data['viewer_id']))
+        db.session.add(ProfReviewLiked(prof_review_id=prof_review.id, user_id=page_data['viewer_id']))
+
+    db.session.commit()
+
+
+def count_queries(client, url, body):
+    """
+    Request a page and count the queries it issued, along with the page
+    :param client: test client
+    :type client: flask.testing.FlaskClient
+    :param url: url of the page
+    :type url: str
+    :param body: json body of the request
+    :type body: dict
+    :return: number of queries and the json of the page
+    :rtype: tuple[int, dict]
+    """
+    from utreview import db
+
+    with QueryCounter(db.engine) as counter:
+        response = client.post(url, json=body)
+    assert response.status_code == 200
+    return counter.count, response.get_json()
+
+
+@pytest.mark.parametrize("logged_in", [False, True])
+@pytest.mark.parametrize("url, id_key, page_id, reviews_key", [
+    ("/api/course_details", "courseId", "course_id", "course_reviews"),
+    ("/api/prof_details", "profId", "prof_id", "prof_reviews")
+])
+def test_details_query_count_is_flat(client, page_data, logged_in, url, id_key, page_id, reviews_key):
+    body = {id_key: page_data[page_id], 'loggedIn': logged_in, 'userEmail': VIEWER_EMAIL if logged_in else None}
+
+    add_reviews(page_data, 1)
+    # the first request also builds the per-worker caches (topic map), which are not part of the page load
+    count_queries(client, url, body)
+    one_review, page = count_queries(client, url, body)
+    assert [review['comments'].endswith("review 1") for review in page[reviews_key]] == [True]
+
+    # more reviews than fit on the first review page, and more courses taught by the prof
+    add_reviews(page_data, 24)
+    add_courses(page_data, 5)
+    many_reviews, page = count_queries(client, url, body)
+    assert len(page[reviews_key]) == 10
+    assert all(review['comments'] for review in page[reviews_key])
+    if page_id == 'prof_id':
+        assert len(page['prof_courses']) == 6
+
+    assert many_reviews == one_review
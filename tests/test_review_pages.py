@@ -0,0 +1,51 @@
+import datetime
+
+import pytest
+
+
+"""
+This .py file contains the checks of the keyset pagination of course/prof reviews.
+"""
+
+
+@pytest.fixture
+def course_reviews(app):
+    """
+    Add reviews of a course, some of them posted at the same time.
+    Returns the ids of the course reviews, newest first
+    """
+    from utreview import db
+    from utreview.models import CourseReview, Review
+
+    review_ids = []
+    for i in range(7):
+        date_posted = datetime.datetime(2020, 9, 1) + datetime.timedelta(days=max(i - 2, 0))
+        review = Review(user_id=1, sem_id=None, submitted=True, date_posted=date_posted)
+        db.session.add(review)
+        db.session.flush()
+
+        course_review = CourseReview(review_id=review.id, course_id=1, approval=True, usefulness=4, difficulty=3,
+                                     workload=3, comments=f"review {i}", date_posted=date_posted)
+        db.session.add(course_review)
+        db.session.flush()
+        review_ids.append(course_review.id)
+
+    db.session.commit()
+
+    # the reviews posted at the same time are ordered by id
+    return review_ids[::-1]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 10])
+def test_newest_pages_break_date_ties_by_id(course_reviews, limit):
+    from utreview.database.load_pages import load_course_review_page
+
+    review_ids = []
+    cursor = None
+    while True:
+        review_rows, cursor = load_course_review_page([1], 'newest', cursor, limit)
+        review_ids += [review_row.id for review_row in review_rows]
+        if cursor is None:
+            break
+
+    assert review_ids == course_reviews
@@ -1,5 +1,6 @@
 
 from .add_to_database import *
+from .load_pages import *
 from .populate_database import *
 from .scheduled_course import *
 
@@ -0,0 +1,416 @@
+import base64
+import datetime
+import json
+
+from sqlalchemy import and_, literal, or_, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+
+from utreview.models.course import *
+from utreview.models.ecis import *
+from utreview.models.like import *
+from utreview.models.others import *
+from utreview.models.prof import *
+from utreview.models.review import *
+from utreview.models.user import *
+
+
+"""
+This .py file contains functions loading the object graph of a details page with eager loading.
+The number of queries is fixed by the loader options, regardless of the number of reviews, profs or sections.
+Reviews are loaded a page at a time with keyset pagination instead of through the course/prof relationships.
+"""
+
+
+# number of reviews embedded in the details pages and default page size of /api/reviews
+REVIEW_PAGE_SIZE = 10
+MAX_REVIEW_PAGE_SIZE = 50
+
+REVIEW_SORTS = ('newest', 'liked', 'semester')
+
+
+def review_options(review_model):
+    """
+    Loader options for course or prof reviews, including everything get_review_info reads.
+    Votes are not loaded, the counts are columns and the viewer's votes come from load_viewer_votes
+    :param review_model: CourseReview or ProfReview
+    :type review_model: model class
+    :return: loader option for the review of a CourseReview or ProfReview
+    :rtype: Load
+    """
+    return selectinload(review_model.review).options(
+        joinedload(Review.semester),
+        joinedload(Review.author).options(
+            joinedload(User.major),
+            joinedload(User.pic)
+        ),
+        selectinload(Review.course_review).joinedload(CourseReview.course).joinedload(Course.dept),
+        selectinload(Review.prof_review).joinedload(ProfReview.prof)
+    )
+
+
+def scheduled_options():
+    """
+    Loader options for scheduled sections. Cross listed sections are loaded separately by load_cross_listed
+    :return: loader options for a ScheduledCourse
+    :rtype: list[Load]
+    """
+    return [
+        joinedload(ScheduledCourse.semester),
+        joinedload(ScheduledCourse.prof),
+        joinedload(ScheduledCourse.course).joinedload(Course.dept)
+    ]
+
+
+def course_prof_options():
+    """
+    Loader options for the profs teaching a course (ecis averages are columns of ProfCourse)
+    :return: loader option for Course.prof_course
+    :rtype: Load
+    """
+    return selectinload(Course.prof_course).joinedload(ProfCourse.prof)
+
+
+def course_page_options():
+    """
+    Loader options for everything read from a course on the course details page
+    :return: loader options for a Course
+    :rtype: list[Load]
+    """
+    return [
+        joinedload(Course.dept),
+        course_prof_options()
+    ]
+
+
+def load_course_page(course_id):
+    """
+    Load a course with the graph needed by the course details page.
+    The topic courses are loaded with the same graph since a parent topic shows the info of its topics
+    :param course_id: id of the course
+    :type course_id: int
+    :return: course with its page graph loaded, None if not found
+    :rtype: Course
+    """
+    return Course.query.options(
+        *course_page_options(),
+        joinedload(Course.topic).selectinload(Topic.courses).options(*course_page_options())
+    ).filter_by(id=course_id).first()
+
+
+def load_prof_page(prof_id):
+    """
+    Load a prof with the graph needed by the prof details page (the courses taught by the prof and their depts)
+    :param prof_id: id of the prof
+    :type prof_id: int
+    :return: prof with its page graph loaded, None if not found
+    :rtype: Prof
+    """
+    return Prof.query.options(
+        selectinload(Prof.prof_course).joinedload(ProfCourse.course).joinedload(Course.dept)
+    ).filter_by(id=prof_id).first()
+
+
+def load_scheduled(owner_column, owner_ids, semesters):
+    """
+    Load the scheduled sections of courses or profs for the given semesters with one query.
+    Sections marked for deletion are skipped. While the FTP update runs, sections not updated yet have
+    mark_deletion = False and updated ones None, so the updated sections are shown if there are any
+    :param owner_column: ScheduledCourse.course_id or ScheduledCourse.prof_id
+    :type owner_column: Column
+    :param owner_ids: ids of the courses/profs
+    :type owner_ids: list[int]
+    :param semesters: semesters to load as {'year': year, 'sem': semester}, unknown semesters have None values
+    :type semesters: list[dict]
+    :return: scheduled sections
+    :rtype: list[ScheduledCourse]
+    """
+    semester_filters = [
+        and_(Semester.year == semester['year'], Semester.semester == semester['sem'])
+        for semester in semesters if semester['year'] is not None
+    ]
+    if len(owner_ids) == 0 or len(semester_filters) == 0:
+        return []
+
+    sem_ids = db.session.query(Semester.id).filter(or_(*semester_filters))
+    scheduled = ScheduledCourse.query.options(*scheduled_options()) \
+        .filter(
+            owner_column.in_(owner_ids),
+            ScheduledCourse.sem_id.in_(sem_ids),
+            or_(ScheduledCourse.mark_deletion.is_(None), ScheduledCourse.mark_deletion == False)
+        ) \
+        .order_by(ScheduledCourse.id) \
+        .all()
+
+    mark_deletion = None if any(s_course.mark_deletion is None for s_course in scheduled) else False
+    return [s_course for s_course in scheduled if s_course.mark_deletion == mark_deletion]
+
+
+def load_course_scheduled(course_ids, semesters):
+    """
+    Load the scheduled sections of courses for the given semesters, see load_scheduled
+    :param course_ids: id of the course (and its topics if it is a parent topic)
+    :type course_ids: list[int]
+    :param semesters: semesters to load as {'year': year, 'sem': semester}
+    :type semesters: list[dict]
+    :return: scheduled sections
+    :rtype: list[ScheduledCourse]
+    """
+    return load_scheduled(ScheduledCourse.course_id, course_ids, semesters)
+
+
+def load_prof_scheduled(prof_id, semesters):
+    """
+    Load the scheduled sections of a prof for the given semesters, see load_scheduled
+    :param prof_id: id of the prof
+    :type prof_id: int
+    :param semesters: semesters to load as {'year': year, 'sem': semester}
+    :type semesters: list[dict]
+    :return: scheduled sections
+    :rtype: list[ScheduledCourse]
+    """
+    return load_scheduled(ScheduledCourse.prof_id, [prof_id], semesters)
+
+
+def load_cross_listed(scheduled):
+    """
+    Load the courses cross listed with the given sections with one query
+    :param scheduled: scheduled sections shown on a page
+    :type scheduled: list[ScheduledCourse]
+    :return: mapping from cross listed id to its courses, without duplicates, as
+        {'id': course id, 'dept': dept abr, 'num': course num, 'title': course title, 'topicNum': topic number}
+    :rtype: dict[int, list[dict]]
+    """
+    xlist_ids = {s_course.cross_listed for s_course in scheduled if s_course.cross_listed is not None}
+    x_listed = {}
+    if len(xlist_ids) == 0:
+        return x_listed
+
+    rows = db.session.query(
+        ScheduledCourse.cross_listed, Course.id, Dept.abr, Course.num, Course.title, Course.topic_num
+    ) \
+        .join(Course, ScheduledCourse.course_id == Course.id) \
+        .join(Dept, Course.dept_id == Dept.id) \
+        .filter(ScheduledCourse.cross_listed.in_(xlist_ids)) \
+        .order_by(ScheduledCourse.id)
+
+    seen = set()
+    for xlist_id, course_id, abr, num, title, topic_num in rows:
+        if (xlist_id, course_id) in seen:
+            continue
+        seen.add((xlist_id, course_id))
+        x_listed.setdefault(xlist_id, []).append({
+            'id': course_id,
+            'dept': abr,
+            'num': num,
+            'title': title,
+            'topicNum': topic_num
+        })
+
+    return x_listed
+
+
+def review_sort_columns(review_model, sort):
+    """
+    Get the columns a page of reviews is ordered by (descending), the review id breaks ties
+    :param review_model: CourseReview or ProfReview
+    :type review_model: model class
+    :param sort: one of REVIEW_SORTS
+    :type sort: str
+    :return: sort columns
+    :rtype: list[Column]
+    """
+    if sort == 'liked':
+        return [review_model.num_liked, review_model.id]
+    elif sort == 'semester':
+        return [Semester.year, Semester.semester, review_model.id]
+    return [review_model.date_posted, review_model.id]
+
+
+def review_sort_values(review_row, sort):
+    """
+    Get the values of the sort columns for a review
+    :param review_row: course review or prof review
+    :type review_row: CourseReview or ProfReview
+    :param sort: one of REVIEW_SORTS
+    :type sort: str
+    :return: sort values
+    :rtype: list
+    """
+    if sort == 'liked':
+        return [review_row.num_liked, review_row.id]
+    elif sort == 'semester':
+        semester = review_row.review.semester
+        return [semester.year, semester.semester, review_row.id]
+    return [review_row.date_posted, review_row.id]
+
+
+def encode_review_cursor(values):
+    """
+    Encode the sort values of the last review of a page into an opaque cursor
+    :param values: sort values
+    :type values: list
+    :return: cursor for the next page
+    :rtype: str
+    """
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_review_cursor(cursor, sort):
+    """
+    Decode a cursor created by encode_review_cursor
+    :param cursor: cursor for the next page
+    :type cursor: str
+    :param sort: one of REVIEW_SORTS, the sort the cursor was created with
+    :type sort: str
+    :return: sort values
+    :rtype: list
+    :raises ValueError: if the cursor is malformed
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(review_sort_columns(CourseReview, sort)):
+            raise ValueError("wrong number of values")
+        if sort == 'newest':
+            values[0] = datetime.datetime.fromisoformat(values[0])
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed review cursor: {cursor}") from e
+
+    return values
+
+
+def load_review_page(review_model, owner_column, owner_ids, sort='newest', cursor=None, limit=REVIEW_PAGE_SIZE):
+    """
+    Load one page of the reviews of courses or profs with keyset pagination.
+    Reviews without comments are not listed, matching get_review_info
+    :param review_model: CourseReview or ProfReview
+    :type review_model: model class
+    :param owner_column: CourseReview.course_id or ProfReview.prof_id
+    :type owner_column: Column
+    :param owner_ids: ids of the courses/profs whose reviews are listed
+    :type owner_ids: list[int]
+    :param sort: one of REVIEW_SORTS
+    :type sort: str
+    :param cursor: cursor returned with the previous page, None for the first page
+    :type cursor: str or None
+    :param limit: max number of reviews on the page
+    :type limit: int
+    :return: reviews of the page and the cursor of the next page (None if this is the last page)
+    :rtype: tuple(list[CourseReview or ProfReview], str or None)
+    :raises ValueError: if the sort is unknown or the cursor is malformed
+    """
+    if sort not in REVIEW_SORTS:
+        raise ValueError(f"Unknown review sort: {sort}")
+
+    sort_columns = review_sort_columns(review_model, sort)
+    query = review_model.query.options(review_options(review_model)) \
+        .filter(owner_column.in_(owner_ids), review_model.comments != "")
+    if sort == 'semester':
+        query = query.join(Review, review_model.review_id == Review.id).join(Semester, Review.sem_id == Semester.id)
+    if cursor is not None:
+        query = query.filter(tuple_(*sort_columns) < tuple_(*decode_review_cursor(cursor, sort)))
+
+    # fetch one extra row to know if there is a next page
+    review_rows = query.order_by(*[column.desc() for column in sort_columns]).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(review_rows) > limit:
+        review_rows = review_rows[:limit]
+        next_cursor = encode_review_cursor(review_sort_values(review_rows[-1], sort))
+
+    return review_rows, next_cursor
+
+
+def load_course_review_page(course_ids, sort='newest', cursor=None, limit=REVIEW_PAGE_SIZE):
+    """
+    Load one page of the reviews of courses, see load_review_page
+    :param course_ids: ids of the course (and its topics if it is a parent topic)
+    :type course_ids: list[int]
+    :param sort: one of REVIEW_SORTS
+    :type sort: str
+    :param cursor: cursor returned with the previous page, None for the first page
+    :type cursor: str or None
+    :param limit: max number of reviews on the page
+    :type limit: int
+    :return: course reviews of the page and the cursor of the next page
+    :rtype: tuple(list[CourseReview], str or None)
+    """
+    return load_review_page(CourseReview, CourseReview.course_id, course_ids, sort, cursor, limit)
+
+
+def load_prof_review_page(prof_id, sort='newest', cursor=None, limit=REVIEW_PAGE_SIZE):
+    """
+    Load one page of the reviews of a prof, see load_review_page
+    :param prof_id: id of the prof
+    :type prof_id: int
+    :param sort: one of REVIEW_SORTS
+    :type sort: str
+    :param cursor: cursor returned with the previous page, None for the first page
+    :type cursor: str or None
+    :param limit: max number of reviews on the page
+    :type limit: int
+    :return: prof reviews of the page and the cursor of the next page
+    :rtype: tuple(list[ProfReview], str or None)
+    """
+    return load_review_page(ProfReview, ProfReview.prof_id, [prof_id], sort, cursor, limit)
+
+
+def load_viewer_votes(user, liked_model, disliked_model, review_key, review_ids):
+    """
+    Load the votes of a user on the given reviews with one query
+    :param user: viewing user, None if not logged in
+    :type user: User
+    :param liked_model: CourseReviewLiked or ProfReviewLiked
+    :type liked_model: model class
+    :param disliked_model: CourseReviewDisliked or ProfReviewDisliked
+    :type disliked_model: model class
+    :param review_key: name of the review id column of the vote models
+    :type review_key: str
+    :param review_ids: ids of the reviews shown to the user
+    :type review_ids: list[int]
+    :return: ids of the reviews the user liked and ids of the reviews the user disliked
+    :rtype: tuple(set[int], set[int])
+    """
+    liked_ids = set()
+    disliked_ids = set()
+    if user is None or len(review_ids) == 0:
+        return liked_ids, disliked_ids
+
+    liked = db.session.query(getattr(liked_model, review_key), literal(True)) \
+        .filter(liked_model.user_id == user.id, getattr(liked_model, review_key).in_(review_ids))
+    disliked = db.session.query(getattr(disliked_model, review_key), literal(False)) \
+        .filter(disliked_model.user_id == user.id, getattr(disliked_model, review_key).in_(review_ids))
+
+    for review_id, is_like in liked.union_all(disliked):
+        if is_like:
+            liked_ids.add(review_id)
+        else:
+            disliked_ids.add(review_id)
+
+    return liked_ids, disliked_ids
+
+
+def load_course_review_votes(user, course_review_ids):
+    """
+    Load the votes of a user on the given course reviews with one query
+    :param user: viewing user, None if not logged in
+    :type user: User
+    :param course_review_ids: ids of the course reviews shown to the user
+    :type course_review_ids: list[int]
+    :return: ids of the course reviews the user liked and disliked
+    :rtype: tuple(set[int], set[int])
+    """
+    return load_viewer_votes(user, CourseReviewLiked, CourseReviewDisliked, 'course_review_id', course_review_ids)
+
+
+def load_prof_review_votes(user, prof_review_ids):
+    """
+    Load the votes of a user on the given prof reviews with one query
+    :param user: viewing user, None if not logged in
+    :type user: User
+    :param prof_review_ids: ids of the prof reviews shown to the user
+    :type prof_review_ids: list[int]
+    :return: ids of the prof reviews the user liked and disliked
+    :rtype: tuple(set[int], set[int])
+    """
+    return load_viewer_votes(user, ProfReviewLiked, ProfReviewDisliked, 'prof_review_id', prof_review_ids)
@@ -3,6 +3,7 @@ import json
 import re
 
 from string import ascii_lowercase
+from sqlalchemy import inspect
 from titlecase import titlecase
 
 from .add_to_database import (
@@ -14,22 +15,39 @@ from .add_to_database import (
 	check_or_add_xlist
 )
 from .scheduled_course import ScheduledCourseInfo
-from utreview import SPRING_SEM, SUMMER_SEM, FALL_SEM, sem_current, sem_next, sem_future
+from utreview import SPRING_SEM, SUMMER_SEM, FALL_SEM
 from utreview.models.course import *
 from utreview.models.ecis import *
+from utreview.models.like import *
 from utreview.models.others import *
 from utreview.models.prof import *
+from utreview.models.review import *
+from utreview.services.catalog import bump_catalog_version, bump_ratings_version
 from utreview.services.fetch_course_info import *
 from utreview.services.fetch_ecis import *
 from utreview.services.fetch_web import KEY_SEM, KEY_DEPT, KEY_CNUM, KEY_TITLE, KEY_UNIQUE, KEY_PROF
+from utreview.services.grade_store import (
+	load_histograms,
+	load_topic_histograms,
+	median_grades,
+	normalize_course_nbr,
+	normalize_dept,
+	normalize_title,
+	prof_key
+)
 from utreview.services.logger import logger
+from utreview.services.semester import current_semesters
+from utreview.services.search_index import update_course_ix, update_prof_ix
 
 
 def refresh_ecis():
 	"""
 	Set course and prof ecis_avg and ecis_students by iterating through ecis_scores
+	Also set the prof course ecis averages and ecis_students
 	"""
 
+	refresh_prof_course_ecis()
+
 	logger.info("Refreshing course and professor ecis fields with respective data")
 	query_tuple = (Course.query.all(), Prof.query.all())
 
@@ -57,6 +75,41 @@ def refresh_ecis():
 			query.ecis_students = students
 			db.session.commit()
 
+	# course and prof ecis averages changed
+	bump_ratings_version()
+
+
+def refresh_prof_course_ecis():
+	"""
+	Set prof course ecis_course_avg, ecis_prof_avg and ecis_students with one grouped query over the ecis scores
+	"""
+
+	logger.info("Refreshing prof course ecis fields with respective data")
+	totals = db.session.query(
+		ProfCourseSemester.prof_course_id,
+		db.func.sum(EcisScore.course_avg * EcisScore.num_students),
+		db.func.sum(EcisScore.prof_avg * EcisScore.num_students),
+		db.func.sum(EcisScore.num_students)
+	).join(EcisScore, EcisScore.prof_course_sem_id == ProfCourseSemester.id) \
+		.group_by(ProfCourseSemester.prof_course_id)
+	totals = {pc_id: (course_total, prof_total, students) for pc_id, course_total, prof_total, students in totals}
+
+	updates = []
+	for pc_id, in db.session.query(ProfCourse.id):
+		course_total, prof_total, students = totals.get(pc_id, (None, None, 0))
+		students = int(students or 0)
+
+		# average will be None if there are no students
+		updates.append({
+			'id': pc_id,
+			'ecis_course_avg': float(course_total) / students if students > 0 and course_total is not None else None,
+			'ecis_prof_avg': float(prof_total) / students if students > 0 and prof_total is not None else None,
+			'ecis_students': students
+		})
+
+	db.session.bulk_update_mappings(ProfCourse, updates)
+	db.session.commit()
+
 
 def populate_ecis(file_path, pages):
 	"""
@@ -69,9 +122,11 @@ def populate_ecis(file_path, pages):
 
 	# FOR FUTURE UPDATES, PLEASE READ:
 	# remember to update Course and Prof ECIS fields when inputting new ECIS scores: ecis_avg and ecis_students
+	# and ProfCourse ECIS fields: ecis_course_avg, ecis_prof_avg and ecis_students
 
 	logger.info(f'Populating ecis database with data from: {file_path}')
 	ecis_lst = parse_ecis_excel(file_path, pages)
+	num_added = 0
 
 	for ecis in ecis_lst:
 
@@ -128,7 +183,26 @@ def populate_ecis(file_path, pages):
 			query.ecis_avg = (total_avg / total_students) if total_students > 0 else None
 			query.ecis_students = total_students
 
+		# updating prof course ecis fields (course and prof averages share the student count)
+		pc_prev_students = pc_obj.ecis_students or 0
+		pc_students = pc_prev_students + students
+		if pc_students > 0:
+			pc_obj.ecis_course_avg = (
+				((pc_obj.ecis_course_avg * pc_prev_students) if pc_obj.ecis_course_avg is not None else 0) +
+				((c_avg * students) if c_avg is not None else 0)
+			) / pc_students
+			pc_obj.ecis_prof_avg = (
+				((pc_obj.ecis_prof_avg * pc_prev_students) if pc_obj.ecis_prof_avg is not None else 0) +
+				((p_avg * students) if p_avg is not None else 0)
+			) / pc_students
+		pc_obj.ecis_students = pc_students
+
 		db.session.commit()
+		num_added += 1
+
+	# course and prof ecis averages changed
+	if num_added > 0:
+		bump_ratings_version()
 
 
 def populate_sem(start_yr=2010, end_yr=2020):
@@ -167,6 +241,7 @@ def populate_prof_course(in_file):
 		for line in f:
 			prof_courses.append(json.loads(line))
 	cur_profs = Prof.query.all()
+	new_courses = []
 
 	# add each prof-course relationship to the database if appropriate
 	for prof_course in prof_courses:
@@ -214,7 +289,9 @@ def populate_prof_course(in_file):
 		# check if course exists -> add if does not exist
 		# TODO: choosing topic 0 by default. Update when topic info available.
 		num_results, course = check_or_add_course(dept, prof_course[KEY_CNUM], prof_course[KEY_TITLE])
-		if num_results > 1:
+		if num_results == 0:
+			new_courses.append(course)
+		elif num_results > 1:
 			courses = Course.query.filter_by(dept_id=dept.id, num=prof_course[KEY_CNUM])
 			for c in courses:
 				if c.topic_num <= 0:
@@ -246,6 +323,11 @@ def populate_prof_course(in_file):
 		check_or_add_prof_course_semester(prof_course[KEY_UNIQUE], prof_course_obj, sem_obj)
 		db.session.commit()
 
+	# add the new courses to the search index
+	if len(new_courses) > 0:
+		update_course_ix(new_courses)
+		bump_catalog_version()
+
 
 def populate_prof_eid(profs):
 	"""
@@ -257,6 +339,7 @@ def populate_prof_eid(profs):
 	# NOTE: professors sometimes have different names by semester -> take most recent (check by eid)]
 
 	cur_profs = Prof.query.all()
+	changed_profs = []
 
 	for semester, name, eid in profs:
 		
@@ -304,14 +387,22 @@ def populate_prof_eid(profs):
 			logger.debug(f'Adding new prof: {first} {last}')
 			new_prof = Prof(first_name=first, last_name=last, eid=eid)
 			db.session.add(new_prof)
+			changed_profs.append(new_prof)
 		else: 
 			logger.debug(f'Updating prof: {target_prof.first_name} {target_prof.last_name} -> {first} {last}')
+			if target_prof.first_name != first or target_prof.last_name != last:
+				changed_profs.append(target_prof)
 			target_prof.first_name = first
 			target_prof.last_name = last
 			target_prof.eid = eid
 
 		db.session.commit()
 
+	# add new and renamed profs to the search index
+	if len(changed_profs) > 0:
+		update_prof_ix(changed_profs)
+		bump_catalog_version()
+
 
 def populate_dept(dept_info, override=False):
 	"""
@@ -427,6 +518,196 @@ def refresh_review_info():
 
 			db.session.commit()
 
+	# course and prof ratings changed
+	bump_ratings_version()
+
+
+def refresh_review_votes():
+	"""
+	Reconcile course and prof review num_liked and num_disliked with the like/dislike rows
+	:return: number of reviews whose counts were corrected
+	:rtype: int
+	"""
+
+	logger.info("Reconciling course and prof review like/dislike counts")
+	num_fixed = 0
+
+	# will iterate between CourseReview and ProfReview since code is identical
+	vote_models = (
+		(CourseReview, CourseReviewLiked, CourseReviewDisliked, 'course_review_id'),
+		(ProfReview, ProfReviewLiked, ProfReviewDisliked, 'prof_review_id')
+	)
+	for review_model, liked_model, disliked_model, review_key in vote_models:
+
+		# count the votes of every review with one grouped query per vote type
+		liked_counts = dict(
+			db.session.query(getattr(liked_model, review_key), db.func.count(liked_model.id))
+			.group_by(getattr(liked_model, review_key))
+		)
+		disliked_counts = dict(
+			db.session.query(getattr(disliked_model, review_key), db.func.count(disliked_model.id))
+			.group_by(getattr(disliked_model, review_key))
+		)
+
+		rows = db.session.query(review_model.id, review_model.num_liked, review_model.num_disliked)
+		updates = []
+		for review_id, num_liked, num_disliked in rows:
+			counts = (liked_counts.get(review_id, 0), disliked_counts.get(review_id, 0))
+			if (num_liked, num_disliked) != counts:
+				updates.append({'id': review_id, 'num_liked': counts[0], 'num_disliked': counts[1]})
+
+		if len(updates) > 0:
+			logger.info(f"Correcting vote counts of {len(updates)} {review_model.__name__} rows")
+			db.session.bulk_update_mappings(review_model, updates)
+			db.session.commit()
+		num_fixed += len(updates)
+
+	return num_fixed
+
+
+def refresh_review_dates():
+	"""
+	Copy Review.date_posted onto the course and prof reviews used to page reviews by date.
+	Once every course and prof review has a date, the date_posted columns of databases created
+	before they were NOT NULL are altered to NOT NULL
+	:return: number of course and prof reviews whose date was corrected
+	:rtype: int
+	"""
+
+	logger.info("Copying review dates onto course and prof reviews")
+	num_fixed = 0
+
+	for review_model in (CourseReview, ProfReview):
+		rows = db.session.query(review_model.id, review_model.date_posted, Review.date_posted) \
+			.join(Review, review_model.review_id == Review.id)
+		updates = [
+			{'id': review_id, 'date_posted': date_posted}
+			for review_id, model_date_posted, date_posted in rows
+			if model_date_posted != date_posted
+		]
+
+		if len(updates) > 0:
+			logger.info(f"Correcting dates of {len(updates)} {review_model.__name__} rows")
+			db.session.bulk_update_mappings(review_model, updates)
+			db.session.commit()
+		num_fixed += len(updates)
+
+		require_review_date(review_model)
+
+	return num_fixed
+
+
+def require_review_date(review_model):
+	"""
+	Alter the date_posted column of course or prof reviews to NOT NULL if it is still nullable in the database.
+	SQLite cannot alter columns, its tables are created from the models with the column already NOT NULL
+	:param review_model: CourseReview or ProfReview
+	:type review_model: model class
+	"""
+
+	table = review_model.__table__.name
+	columns = {column['name']: column for column in inspect(db.engine).get_columns(table)}
+	if not columns['date_posted']['nullable'] or db.engine.dialect.name != 'mysql':
+		return
+
+	logger.info(f"Altering {table}.date_posted to NOT NULL")
+	db.session.execute(f"ALTER TABLE {table} MODIFY date_posted DATETIME NOT NULL")
+	db.session.commit()
+
+
+def refresh_median_grades():
+	"""
+	Set Course and Prof median_grade from the grade distribution store, computing every median at once
+	:return: number of courses and profs whose median grade changed
+	:rtype: int
+	"""
+
+	logger.info("Refreshing course and prof median grades")
+	num_changed = 0
+
+	# courses: topic courses use the grades of their topic (matched to the current topic titles),
+	# other courses every grade of the course number
+	course_keys, course_histograms = load_histograms(['dept', 'course_nbr'])
+	topic_keys, topic_histograms = load_topic_histograms()
+	course_medians = dict(zip(course_keys, median_grades(course_histograms)))
+	topic_medians = dict(zip(topic_keys, median_grades(topic_histograms)))
+
+	updates = []
+	rows = db.session.query(Course.id, Dept.abr, Course.num, Course.topic_num, Course.title, Course.median_grade) \
+		.join(Dept, Course.dept_id == Dept.id)
+	for course_id, abr, num, topic_num, title, old_median in rows:
+		if topic_num > 0:
+			median = topic_medians.get((normalize_dept(abr), normalize_course_nbr(num), normalize_title(title)))
+		else:
+			median = course_medians.get((normalize_dept(abr), normalize_course_nbr(num)))
+		if median != old_median:
+			updates.append({'id': course_id, 'median_grade': median})
+
+	if len(updates) > 0:
+		db.session.bulk_update_mappings(Course, updates)
+		db.session.commit()
+	num_changed += len(updates)
+
+	# profs
+	prof_keys, prof_histograms = load_histograms(['prof_key'])
+	prof_medians = {key[0]: median for key, median in zip(prof_keys, median_grades(prof_histograms))}
+
+	updates = []
+	for prof_id, first_name, last_name, old_median in db.session.query(Prof.id, Prof.first_name, Prof.last_name, Prof.median_grade):
+		median = prof_medians.get(prof_key(first_name, last_name))
+		if median != old_median:
+			updates.append({'id': prof_id, 'median_grade': median})
+
+	if len(updates) > 0:
+		db.session.bulk_update_mappings(Prof, updates)
+		db.session.commit()
+	num_changed += len(updates)
+
+	logger.info(f"Median grades changed for {num_changed} courses and profs")
+	return num_changed
+
+
+def refresh_prof_course_stats():
+	"""
+	Rebuild the ProfCourseStats rating totals from the submitted reviews
+	:return: number of prof/course pairs with ratings
+	:rtype: int
+	"""
+
+	logger.info("Rebuilding prof course rating totals")
+
+	# total the ratings of every prof/course pair with one grouped query
+	totals = db.session.query(
+		CourseReview.course_id,
+		ProfReview.prof_id,
+		db.func.count(CourseReview.id),
+		db.func.sum(db.cast(CourseReview.approval, db.Integer)),
+		db.func.sum(db.cast(ProfReview.approval, db.Integer)),
+		db.func.sum(CourseReview.difficulty),
+		db.func.sum(CourseReview.usefulness),
+		db.func.sum(CourseReview.workload),
+		db.func.sum(ProfReview.clear),
+		db.func.sum(ProfReview.engaging),
+		db.func.sum(ProfReview.grading)
+	).join(ProfReview, ProfReview.review_id == CourseReview.review_id) \
+		.join(Review, Review.id == CourseReview.review_id) \
+		.filter(Review.submitted == True, CourseReview.course_id != None, ProfReview.prof_id != None) \
+		.group_by(CourseReview.course_id, ProfReview.prof_id)
+
+	keys = (
+		'course_id', 'prof_id', 'num_ratings', 'course_approved', 'prof_approved',
+		'difficulty_total', 'usefulness_total', 'workload_total', 'clear_total', 'engaging_total', 'grading_total'
+	)
+	rows = [{key: int(value) for key, value in zip(keys, row)} for row in totals]
+
+	# replace the totals in one transaction
+	ProfCourseStats.query.delete()
+	db.session.bulk_insert_mappings(ProfCourseStats, rows)
+	db.session.commit()
+
+	logger.info(f"Rebuilt rating totals for {len(rows)} prof/course pairs")
+	return len(rows)
+
 
 def populate_scheduled_course(course_info):
 	"""
@@ -513,6 +794,7 @@ def update_scheduled_courses(s_course_queue):
 	"""
 
 	logger.info("Updating scheduled course information")
+	sem_current, sem_next, sem_future = current_semesters()
 	semesters = {
 		'current': {
 			'courses': {},
@@ -622,6 +904,7 @@ def update_scheduled_courses(s_course_queue):
 	logger.info("Updating course and professor semesters")
 	all_profs = Prof.query.all()
 	all_courses = Course.query.all()
+	num_changed = 0
 
 	for prof in all_profs:
 		if (
@@ -633,6 +916,7 @@ def update_scheduled_courses(s_course_queue):
 			prof.next_sem = semesters['next']['profs'].get(prof.id, False)
 			prof.future_sem = semesters['future']['profs'].get(prof.id, False)
 			db.session.commit()
+			num_changed += 1
 
 	for course in all_courses:
 		if (
@@ -644,6 +928,11 @@ def update_scheduled_courses(s_course_queue):
 			course.next_sem = semesters['next']['courses'].get(course.id, False)
 			course.future_sem = semesters['future']['courses'].get(course.id, False)
 			db.session.commit()
+			num_changed += 1
+
+	# the semesters of courses/profs are part of the catalog snapshot
+	if num_changed > 0:
+		bump_ratings_version()
 
 
 def update_scheduled_course(old, new, x_list):
@@ -693,6 +982,8 @@ def populate_prof(prof_info):
 			prof = Prof(first_name=first_name, last_name=last_name, eid=eid)
 			db.session.add(prof)
 			db.session.commit()
+			update_prof_ix([prof])
+			bump_catalog_version()
 		else:
 			logger.debug(f"Professor {first_name} {last_name} already exists")
 	else:
@@ -710,6 +1001,7 @@ def populate_course(course_info, cur_sem=None):
 
 	__inherit = "(See Base Topic for inherited information.)"
 	null_depts = set()
+	changed_courses = []
 
 	logger.info("Populating database with courses")
 
@@ -789,16 +1081,23 @@ def populate_course(course_info, cur_sem=None):
 			# new course
 			logger.debug(f"Creating new course {dept_obj.abr} {new_course.num}")
 			db.session.add(new_course)
+			changed_courses.append(new_course)
 		elif cur_sem is None or semester == cur_sem:
 			# course existed but replacing
 			logger.debug(f"Replacing previous {old_course.dept.abr} {old_course.num}")
 			__replace_course(old_course, new_course)
+			changed_courses.append(old_course)
 		else:
 			# course existed and skipping
 			logger.debug(f"Already existed: {old_course.dept.abr} {old_course.num}")
 
 		db.session.commit()
 
+	# add new and replaced courses to the search index
+	if len(changed_courses) > 0:
+		update_course_ix(changed_courses)
+		bump_catalog_version()
+
 	null_depts = list(null_depts)
 	null_depts.sort()
 	for dept in null_depts:
@@ -1,5 +1,5 @@
 
-from utreview import int_or_none
+from utreview.services.semester import int_or_none
 from utreview.models.others import ScheduledCourse
 
 
@@ -59,6 +59,9 @@ class Course(db.Model):
     usefulness = db.Column(db.Float, nullable=True)
     workload = db.Column(db.Float, nullable=True)
 
+    # median grade from the UT Catalyst grade distributions (update when grades.db changes)
+    median_grade = db.Column(db.String(2), nullable=True)
+
     # scheduled/semester fields -> True if the course is taught at the specified semester
     current_sem = db.Column(db.Boolean, nullable=False, default=False)
     next_sem = db.Column(db.Boolean, nullable=False, default=False)
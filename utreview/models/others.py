@@ -49,6 +49,10 @@ class ScheduledCourse(db.Model):
     Class pertaining to a scheduled course for a course for a specific semester
     This contains data for the times, location, and enrollment of the class
     """
+    __table_args__ = (
+        db.Index('ix_scheduled_course_course_sem', 'course_id', 'sem_id', 'mark_deletion'),
+        db.Index('ix_scheduled_course_prof_sem', 'prof_id', 'sem_id', 'mark_deletion')
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -90,6 +94,11 @@ class ProfCourse(db.Model):
 
     prof_id = db.Column(db.Integer, db.ForeignKey('prof.id'), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+
+    # ecis fields, student weighted over all semesters (update on new ecis scores)
+    ecis_course_avg = db.Column(db.Float, nullable=True)
+    ecis_prof_avg = db.Column(db.Float, nullable=True)
+    ecis_students = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     prof_course_sem = db.relationship('ProfCourseSemester', backref="prof_course", lazy=True)
 
@@ -101,6 +110,39 @@ class ProfCourse(db.Model):
                             )"""
 
 
+class ProfCourseStats(db.Model):
+    """
+    Class holding the rating totals of the submitted reviews for a professor teaching a course.
+    Totals are kept instead of averages so reviews can be added, edited and removed incrementally.
+    """
+    __table_args__ = (
+        db.Index('ix_prof_course_stats_course_prof', 'course_id', 'prof_id', unique=True),
+        db.Index('ix_prof_course_stats_prof', 'prof_id')
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # number of reviews and number of reviews approving the course/prof
+    num_ratings = db.Column(db.Integer, nullable=False, default=0)
+    course_approved = db.Column(db.Integer, nullable=False, default=0)
+    prof_approved = db.Column(db.Integer, nullable=False, default=0)
+
+    # rating totals
+    difficulty_total = db.Column(db.Integer, nullable=False, default=0)
+    usefulness_total = db.Column(db.Integer, nullable=False, default=0)
+    workload_total = db.Column(db.Integer, nullable=False, default=0)
+    clear_total = db.Column(db.Integer, nullable=False, default=0)
+    engaging_total = db.Column(db.Integer, nullable=False, default=0)
+    grading_total = db.Column(db.Integer, nullable=False, default=0)
+
+    # id fields (same pair as ProfCourse)
+    prof_id = db.Column(db.Integer, db.ForeignKey('prof.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+
+    def __repr__(self):
+        return f"ProfCourseStats(prof_id={self.prof_id}, course_id={self.course_id}, num_ratings={self.num_ratings})"
+
+
 class ProfCourseSemester(db.Model):
     """
     Class used to map relationships between prof_course and semester. This is used to map what
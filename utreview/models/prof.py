@@ -24,6 +24,9 @@ class Prof(db.Model):
     engaging = db.Column(db.Float, nullable=True)
     grading = db.Column(db.Float, nullable=True)
 
+    # median grade from the UT Catalyst grade distributions (update when grades.db changes)
+    median_grade = db.Column(db.String(2), nullable=True)
+
     # semester data fields (update on new FTP files) -> whether the professor is teaching the given semester
     current_sem = db.Column(db.Boolean, nullable=False, default=False)
     next_sem = db.Column(db.Boolean, nullable=False, default=False)
@@ -35,6 +35,11 @@ class CourseReview(db.Model):
     """
     Class pertaining the course section of a review
     """
+    __table_args__ = (
+        db.Index('ix_course_review_course_date', 'course_id', 'date_posted'),
+        db.Index('ix_course_review_course_liked', 'course_id', 'num_liked')
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     # course review metrics data and comments
@@ -44,6 +49,14 @@ class CourseReview(db.Model):
     workload = db.Column(db.Integer, nullable=False)
     comments = db.Column(db.Text, nullable=False)
 
+    # vote counts (update on review feedback, reconcile with users_liked/users_disliked)
+    num_liked = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    num_disliked = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # copy of Review.date_posted so the reviews can be paged by date from the index above
+    # (existing databases: the 'review_dates' command backfills it and sets it NOT NULL)
+    date_posted = db.Column(db.DateTime, nullable=False)
+
     # relationship fields
     users_liked = db.relationship('CourseReviewLiked', backref='course_review', lazy=True)
     users_disliked = db.relationship('CourseReviewDisliked', backref='course_review', lazy=True)
@@ -66,6 +79,11 @@ class ProfReview(db.Model):
     """
     Class pertaining to the professor section of a review
     """
+    __table_args__ = (
+        db.Index('ix_prof_review_prof_date', 'prof_id', 'date_posted'),
+        db.Index('ix_prof_review_prof_liked', 'prof_id', 'num_liked')
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     # course review metrics data and comments
@@ -75,6 +93,14 @@ class ProfReview(db.Model):
     grading = db.Column(db.Integer, nullable=False)
     comments = db.Column(db.Text, nullable=False)
 
+    # vote counts (update on review feedback, reconcile with users_liked/users_disliked)
+    num_liked = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    num_disliked = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # copy of Review.date_posted so the reviews can be paged by date from the index above
+    # (existing databases: the 'review_dates' command backfills it and sets it NOT NULL)
+    date_posted = db.Column(db.DateTime, nullable=False)
+
     # relationship fields
     users_liked = db.relationship('ProfReviewLiked', backref='prof_review', lazy=True)
     users_disliked = db.relationship('ProfReviewDisliked', backref='prof_review', lazy=True)
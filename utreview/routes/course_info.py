@@ -12,8 +12,16 @@ import timeago, datetime
 import json
 from flask import request, jsonify
 from utreview.models import *
-from utreview import app
-from .catalyst import course_median_grade
+from utreview import app, db
+from utreview.database.load_pages import (
+    load_course_page,
+    load_course_review_page,
+    load_course_review_votes,
+    load_course_scheduled,
+    load_cross_listed
+)
+from utreview.services.semester import get_semesters, schedule_semesters
+from utreview.services.topic_map import get_topic_map
 
 @app.route('/api/course_id', methods=['POST'])
 def course_id():
@@ -75,11 +83,7 @@ def course_id():
                 # if the course is a topic course, find the topic id and parent id
                 if(topic_num >= 0):
                     topic_id = course.topic_id
-
-                    # find the parent id
-                    for topic in course.topic.courses:
-                        if(topic.topic_num == 0):
-                            parent_id = topic.id
+                    parent_id = get_topic_map().parent_id(topic_id)
                 else:
                     topic_id = -1
 
@@ -108,7 +112,8 @@ def course_details():
             "course_requisites" (object): course requisites,
             "course_profs" (list): list of profs that teach the course
             "course_schedule" (object): course schedule
-            "course_reviews" (list): list of reviews for the course
+            "course_reviews" (list): first page of reviews for the course (newest first)
+            "course_reviews_cursor" (string): cursor of the next page of reviews for /api/reviews, None if no more reviews
             "is_parent" (boolean): shows whether course is a parent topic
     """
     # get args from the front end
@@ -125,7 +130,7 @@ def course_details():
     # get course details information
     course_info, course, is_parent = get_course_info(course_id)
     course_requisites = get_course_requisites(course)
-    course_rating, review_list = get_course_reviews(course, logged_in, curr_user, is_parent)
+    course_rating, review_list, review_cursor = get_course_reviews(course, logged_in, curr_user, is_parent)
     course_schedule = get_course_schedule(course, is_parent)
     prof_list = get_course_profs(course, is_parent)
 
@@ -136,6 +141,7 @@ def course_details():
                       "course_profs": prof_list,
                       "course_schedule": course_schedule,
                       "course_reviews": review_list,
+                      "course_reviews_cursor": review_cursor,
                       "is_parent": is_parent})
 
     return result
@@ -167,8 +173,8 @@ def get_course_info(course_id):
         course (model instance): course specified by course id
         is_parent (boolean): signifies whether the course is a parent topic
     """
-    # find course in database
-    course = Course.query.filter_by(id=course_id).first()
+    # find course in database, along with everything shown on the course page
+    course = load_course_page(course_id)
     course_dept = course.dept
     topic_num = course.topic_num
 
@@ -200,18 +206,16 @@ def get_course_info(course_id):
             is_parent = False
     else:
         # course is a topic course, but not the parent topic
-        topic = course.topic
         parent_title = ""
         topics_list = None
         
-        # find the parent topic for the course
-        for course_topic in topic.courses:
-            if course_topic.topic_num == 0:
-                parent_title = course_topic.title
-                parent_id = course_topic.id
+        # find the parent topic for the course (already loaded with the topic courses, no query)
+        parent_id = get_topic_map().parent_id(course.topic_id)
+        if(parent_id is not None):
+            parent_title = Course.query.get(parent_id).title
     
-    # find median grade for the course
-    median_grade = course_median_grade(course_dept.abr, course.num, topic_num, course.title)
+    # median grade for the course, precomputed from the grade distributions
+    median_grade = course.median_grade
 
     # return all course info information
     course_info = {
@@ -270,26 +274,22 @@ def get_ecis(course, prof):
     if prof_course is None:
         return None, None
 
-    scores = []
-    # get list of ecis scores for each semester for the prof/course combination
-    for pcs in prof_course.prof_course_sem:
-        for ecis in pcs.ecis:
-            scores.append(ecis)
+    return get_prof_course_ecis(prof_course)
 
-    if len(scores) == 0:
-        course_ecis = None
-        prof_ecis = None
-    else:
-        # calculate average prof/course ecis score for the prof/course combination
-        total_students = 0
-        course_ecis = 0
-        prof_ecis = 0
-        for ecis in scores:
-            course_ecis += ecis.course_avg * ecis.num_students
-            prof_ecis += ecis.prof_avg * ecis.num_students
-            total_students += ecis.num_students
-        course_ecis = round(course_ecis / total_students, 1)
-        prof_ecis = round(prof_ecis / total_students, 1)
+def get_prof_course_ecis(prof_course):
+    """
+    Given a prof course model instance, obtain the average ecis scores over all semesters
+
+    Args:
+        prof_course (model instance): prof course instance
+
+    Returns:
+        course_ecis (float): Average course ecis score
+        prof_ecis (float): Average prof ecis score
+    """
+    # averages are kept up to date by populate_ecis/refresh_ecis
+    course_ecis = round(prof_course.ecis_course_avg, 1) if prof_course.ecis_course_avg is not None else None
+    prof_ecis = round(prof_course.ecis_prof_avg, 1) if prof_course.ecis_prof_avg is not None else None
 
     return course_ecis, prof_ecis
 
@@ -338,13 +338,38 @@ def time_to_string(time_to_string):
 
     return time_string
 
-def get_scheduled_course(scheduled_course, is_parent):
+def get_topic_items(course, is_parent, relationship):
+    """
+    Get the items of a course relationship, along with those of its topics if the course is a parent topic
+
+    Args:
+        course (model instance): course
+        is_parent (boolean): signifies whether the course is a parent topic
+        relationship (string): name of the course relationship (ex: 'prof_course')
+
+    Returns:
+        items (list): items of the course followed by the items of its topics, without duplicates
+    """
+    # copy the list, appending to the relationship itself would move the items to this course
+    items = list(getattr(course, relationship))
+    if(is_parent):
+        item_ids = {item.id for item in items}
+        for topic_course in course.topic.courses:
+            for item in getattr(topic_course, relationship):
+                if(item.id not in item_ids):
+                    item_ids.add(item.id)
+                    items.append(item)
+
+    return items
+
+def get_scheduled_course(scheduled_course, is_parent, x_listed_courses=()):
     """
     Obtain information for the scheduled course
 
     Args:
         scheduled_course (model instance): scheduled course
         is_parent (boolean): true if course is a parent topic
+        x_listed_courses (list): courses cross listed with the scheduled course, see load_cross_listed
 
     Returns:
         scheduled_obj (obj): Contains detailed information about the scheduled course
@@ -382,25 +407,14 @@ def get_scheduled_course(scheduled_course, is_parent):
     elif(scheduled_course.semester.semester == 9):
         semester_name = "Fall"
 
-    # obtain list of cross listed courses
+    # obtain list of cross listed courses, excluding the course itself
     x_listed = []
-    x_listed_ids = []
-    x_listed_ids.append(scheduled_course.course.id)
-    if(scheduled_course.xlist is not None):
-        for x_course in scheduled_course.xlist.courses:
-            if(x_course.course.id in x_listed_ids):
-                continue
-            if(is_parent and x_course.course.topic_num != 0):
-                continue
-            x_listed_ids.append(x_course.course.id)
-            x_listed_obj = {
-                'id': x_course.course.id,
-                'dept': x_course.course.dept.abr,
-                'num': x_course.course.num,
-                'title': x_course.course.title,
-                'topicNum': x_course.course.topic_num
-            }
-            x_listed.append(x_listed_obj)
+    for x_listed_obj in x_listed_courses:
+        if(x_listed_obj['id'] == scheduled_course.course_id):
+            continue
+        if(is_parent and x_listed_obj['topicNum'] != 0):
+            continue
+        x_listed.append(x_listed_obj)
 
     # return scheduled course information
     scheduled_obj = {
@@ -437,74 +451,24 @@ def get_course_schedule(course, is_parent):
             "futureSem" (list): list of scheduled courses for the future semester
         }
     """
-    # current and future semester, as labeled by FTP, update manually
-    with open('input_data/semester.txt') as f:
-        semesters = json.load(f)
-        
-    current_sem = {
-        'year': int(semesters['current'][0:-1]) if semesters['current'] is not None else None,
-        'sem': int(semesters['current'][-1]) if semesters['current'] is not None else None
-    }
-
-    future_sem_year = None
-    future_sem_sem = None
-    if(current_sem['year'] is not None):
-        if(current_sem['sem'] == 9):
-            future_sem_year = current_sem['year'] + 1
-            future_sem_sem = 2
-        elif(current_sem['sem'] == 2):
-            future_sem_year = current_sem['year']
-            future_sem_sem = 6
-        elif(current_sem['sem'] == 6):
-            future_sem_year = current_sem['year']
-            future_sem_sem = 9
-
-    future_sem = {
-        'year': future_sem_year,
-        'sem': future_sem_sem
-    }
+    # current and future semester, as labeled by FTP, kept in memory by the semester service
+    semesters = get_semesters()
+    current_sem, future_sem = schedule_semesters()
 
     # obtain list of scheduled courses for current and future semesters
     current_list = []
     future_list = []
-    courses_scheduled_ids = []
-    courses_scheduled_list = []
-
-    # decide to whether to display courses that have mark_deletion = False or mark_deletion = None
-    mark_false = True
-    scheduled = ScheduledCourse.query.filter_by(mark_deletion=None, course_id=course.id)
-    if(scheduled.count() > 0):
-        mark_false = False
-
-    for i in range(len(course.scheduled)):
-        if(mark_false):
-            if(course.scheduled[i].mark_deletion != False):
-                continue
-        else:
-            if(course.scheduled[i].mark_deletion != None):
-                continue
-        courses_scheduled_ids.append(course.scheduled[i].id)
-        courses_scheduled_list.append(course.scheduled[i])
-    
-    # if course is a parent topic, get list of scheduled instances for children topics
-    if(is_parent):
-        topic = course.topic
-        for topic_course in topic.courses:
-            for topic_scheduled in topic_course.scheduled:
-                if(topic_scheduled.id in courses_scheduled_ids):
-                    continue
-                if(mark_false):
-                    if(topic_scheduled.mark_deletion != False):
-                        continue
-                else:
-                    if(topic_scheduled.mark_deletion != None):
-                        continue
-                courses_scheduled_ids.append(topic_scheduled.id)
-                courses_scheduled_list.append(topic_scheduled)
+
+    # load the sections of the two semesters in one query (mark_deletion = None, or False while the FTP update runs)
+    # if course is a parent topic, include scheduled instances for children topics
+    courses_scheduled_list = load_course_scheduled(get_topic_course_ids(course, is_parent), [current_sem, future_sem])
+
+    # resolve the cross listed courses of every section in one query
+    x_listed = load_cross_listed(courses_scheduled_list)
 
     # for each scheduled course instance, get scheduled course information and append it to corresponding list
     for scheduled_course in courses_scheduled_list:
-        scheduled_obj = get_scheduled_course(scheduled_course, is_parent)
+        scheduled_obj = get_scheduled_course(scheduled_course, is_parent, x_listed.get(scheduled_course.cross_listed, []))
         if(scheduled_course.semester.year == current_sem['year'] and
         scheduled_course.semester.semester == current_sem['sem']):
             current_list.append(scheduled_obj)
@@ -524,7 +488,7 @@ def get_course_schedule(course, is_parent):
 
     return course_schedule
 
-def get_review_info(review, logged_in, curr_user):
+def get_review_info(review, logged_in, curr_user, liked_ids=frozenset(), disliked_ids=frozenset()):
     """
     Get review information for a particular review instance
 
@@ -536,6 +500,8 @@ def get_review_info(review, logged_in, curr_user):
         workload (int): average workload over all reviews
         logged_in (boolean): tells whether user is logged in
         curr_user (model instance): currently logged in user
+        liked_ids (set): ids of the reviews the current user liked
+        disliked_ids (set): ids of the reviews the current user disliked
 
     Returns:
         review_object (object): Object containing detailed information about the review
@@ -585,24 +551,12 @@ def get_review_info(review, logged_in, curr_user):
     user_first_name = user.first_name
     user_last_name = user.last_name
 
-    num_liked = 0
-    num_disliked = 0
-    like_pressed = False
-    dislike_pressed = False
-
-    # calculate number of likes and determine if current user liked the review
-    for like in course_review.users_liked:
-        num_liked += 1
-        if(logged_in):
-            if(curr_user.id == like.user_id):
-                like_pressed = True
-
-    # calulcate number of dislikes and determine if current user disliked the review
-    for dislike in course_review.users_disliked:
-        num_disliked += 1
-        if(logged_in):
-            if(curr_user.id == dislike.user_id):
-                dislike_pressed = True
+    num_liked = course_review.num_liked
+    num_disliked = course_review.num_disliked
+
+    # determine if current user liked or disliked the review
+    like_pressed = course_review.id in liked_ids
+    dislike_pressed = course_review.id in disliked_ids
     
     # if the review comment is empty, return None
     if(course_review.comments == ""):
@@ -638,9 +592,62 @@ def get_review_info(review, logged_in, curr_user):
 
     return review_object
 
+def get_topic_course_ids(course, is_parent):
+    """
+    Get the ids of the courses whose reviews, sections and profs are shown for a course
+
+    Args:
+        course (model instance): course
+        is_parent (boolean): whether course is a parent topic
+
+    Returns:
+        course_ids (list): id of the course, along with the ids of its topics if the course is a parent topic
+    """
+    if(is_parent):
+        return get_topic_map().course_ids(course.topic_id)
+    return [course.id]
+
+def is_parent_topic(course):
+    """
+    Check whether a course is a parent topic with at least one topic under it
+
+    Args:
+        course (model instance): course
+
+    Returns:
+        is_parent (boolean): signifies whether the course is a parent topic
+    """
+    if(course.topic_num != 0):
+        return False
+    return len(get_topic_map().child_ids(course.topic_id)) > 0
+
+def get_review_list(review_rows, logged_in, curr_user):
+    """
+    Get review information for a page of course reviews
+
+    Args:
+        review_rows (list): course reviews of the page
+        logged_in (boolean): tells whether user is logged in
+        curr_user (model instance): currently logged in user
+
+    Returns:
+        review_list (list): review objects of the page, see get_review_info
+    """
+    # obtain the current user's votes on these reviews in one query
+    liked_ids, disliked_ids = load_course_review_votes(curr_user if logged_in else None,
+                                                       [course_review.id for course_review in review_rows])
+
+    review_list = []
+    for course_review in review_rows:
+        review_object = get_review_info(course_review.review, logged_in, curr_user, liked_ids, disliked_ids)
+        if review_object:
+            review_list.append(review_object)
+
+    return review_list
+
 def get_course_reviews(course, logged_in, curr_user, is_parent):
     """
-    Get information for all reviews of the course
+    Get the rating of the course and the first page of its reviews
 
     Args:
         course (model instance): course
@@ -658,32 +665,12 @@ def get_course_reviews(course, logged_in, curr_user, is_parent):
                 'workload' (float): average workload
                 'numRatings' (int): number of ratings
             }
-        review_list (list): list of all reviews for the course
+        review_list (list): newest reviews for the course, the rest are fetched from /api/reviews
+        review_cursor (string): cursor of the next page of reviews, None if there are no more reviews
     """
-    # obtain list of course reviews
-    course_reviews_ids = []
-    course_reviews = course.reviews
-    for i in range(len(course.reviews)):
-        course_reviews_ids.append(course.reviews[i].id)
-
-    # if course is parent topic, obtain reviews from children topics
-    if(is_parent):
-        topic = course.topic
-        for topic_course in topic.courses:
-            topic_course_reviews = topic_course.reviews.copy()
-            for i in range(len(topic_course_reviews)):
-                if(topic_course_reviews[i].id in course_reviews_ids):
-                    continue
-                course_reviews_ids.append(topic_course_reviews[i].id)
-                course_reviews.append(topic_course_reviews[i])
-
-    # iterate through all course reviews and add to review list
-    review_list = []
-    for course_review in course_reviews:
-        review = course_review.review
-        review_object = get_review_info(review, logged_in, curr_user)
-        if review_object:
-            review_list.append(review_object)
+    # obtain the first page of course reviews, including reviews from children topics if course is parent topic
+    review_rows, review_cursor = load_course_review_page(get_topic_course_ids(course, is_parent))
+    review_list = get_review_list(review_rows, logged_in, curr_user)
 
     # return course rating information
     course_rating = {
@@ -695,7 +682,7 @@ def get_course_reviews(course, logged_in, curr_user, is_parent):
         'numRatings': course.num_ratings
     }
 
-    return course_rating, review_list
+    return course_rating, review_list, review_cursor
 
 def get_course_profs(course, is_parent):
     """
@@ -718,65 +705,42 @@ def get_course_profs(course, is_parent):
                 'eCIS' (float): ecis prof score
             }
     """
-    # obtain list of all profs that teach the course
+    # obtain list of all profs that teach the course, including profs for all children topics if course is parent topic
     prof_list = []
-    course_prof = course.prof_course
-    course_prof_ids = []
-    for i in range(len(course.prof_course)):
-        course_prof_ids.append(course.prof_course[i].id)
+    course_prof = get_topic_items(course, is_parent, 'prof_course')
+
+    # ecis scores are for the prof teaching this course
+    ecis_by_prof = {prof_course.prof_id: get_prof_course_ecis(prof_course) for prof_course in course.prof_course}
+
+    # sum the rating totals of each prof over the course (and its children topics) in one query
+    course_ids = get_topic_course_ids(course, is_parent)
+    totals_by_prof = {
+        prof_id: [int(total) for total in totals] for prof_id, *totals in
+        db.session.query(ProfCourseStats.prof_id, db.func.sum(ProfCourseStats.num_ratings),
+                         db.func.sum(ProfCourseStats.prof_approved), db.func.sum(ProfCourseStats.clear_total),
+                         db.func.sum(ProfCourseStats.engaging_total), db.func.sum(ProfCourseStats.grading_total))
+        .filter(ProfCourseStats.course_id.in_(course_ids))
+        .group_by(ProfCourseStats.prof_id)
+    }
 
-    # if course is parent topic, obtain profs for all children topics
-    if(is_parent):
-        topic = course.topic
-        for topic_course in topic.courses:
-            topic_prof_course = topic_course.prof_course.copy()
-            for i in range(len(topic_prof_course)):
-                if(topic_prof_course[i].id in course_prof_ids):
-                    continue
-                course_prof_ids.append(topic_prof_course[i].id)
-                course_prof.append(topic_prof_course[i])
-    
     # iterate through course prof instances and add to course prof list
     for prof_course in course_prof:
 
         prof = prof_course.prof
-        course_ecis, prof_ecis = get_ecis(course, prof)
-
-        prof_reviews = prof.reviews
-        course_reviews = course.reviews
-        review_ids = [course_review.review_id for course_review in course_reviews]
-        reviews = []
-
-        # iterate through all prof reviews and calculate average metrics
-        for prof_review in prof_reviews:
-            if(prof_review.review_id in review_ids):
-                reviews.append(prof_review.review)
+        course_ecis, prof_ecis = ecis_by_prof.get(prof.id, (None, None))
+        num_ratings, approved, clear, engaging, grading = totals_by_prof.get(prof.id, (0, 0, 0, 0, 0))
 
-        # calculate average metrics       
-        if(len(reviews) == 0):
+        # calculate average metrics
+        if(num_ratings <= 0):
             percentLiked = None
             clear = None
             engaging = None
             grading = None
         else:
-            percentLiked = 0
-            clear = 0
-            engaging = 0
-            grading = 0
-
-            # iterate through all the reviews
-            for review in reviews:
-                prof_review = review.prof_review[0]
-                if(prof_review.approval):
-                    percentLiked += 1
-                clear += prof_review.clear
-                engaging += prof_review.engaging
-                grading += prof_review.grading
-
-            percentLiked = round(percentLiked/len(reviews), 2) * 100
-            clear = round(clear/len(reviews), 1)
-            engaging = round(engaging/len(reviews), 1)
-            grading = round(grading/len(reviews), 1)
+            percentLiked = round(approved/num_ratings, 2) * 100
+            clear = round(clear/num_ratings, 1)
+            engaging = round(engaging/num_ratings, 1)
+            grading = round(grading/num_ratings, 1)
 
         # return object containing prof information
         prof_obj = {
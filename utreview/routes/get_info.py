@@ -16,7 +16,10 @@ import json
 from flask import request, jsonify
 from flask_jwt_extended import (create_access_token)
 from utreview.models import *
+from sqlalchemy.orm import joinedload
 from utreview import app, db
+from utreview.services.semester import current_semesters, following_semester, semester_string, split_semester
+from utreview.services.topic_map import get_topic_map
 from whoosh.fields import *
 
 
@@ -46,25 +49,24 @@ def get_courses():
     prof = Prof.query.filter_by(id=prof_id).first()
     prof_course = prof.prof_course
 
-    # iterate through courses and add to list if not a child topic course
-    courses = []
+    # if the course is a child topic, list the parent topic instead, skipping courses already in the list
+    topic_map = get_topic_map()
     course_ids = []
     for listing in prof_course:
+        course_id = topic_map.root_id(listing.course_id)
+        if(course_id not in course_ids):
+            course_ids.append(course_id)
 
-        # if the course is a child topic, add the parent topic to the list
-        course = listing.course
-        if(course.topic_num > 0):
-            topic_courses = course.topic.courses
-            for topic_course in topic_courses:
-                if(topic_course.topic_num == 0):
-                    course = topic_course
-
-        # skip if the course is already in the list
-        if(course.id in course_ids):
-            continue
-        course_ids.append(course.id)
+    # load the listed courses with their depts in one query
+    courses_by_id = {
+        course.id: course for course in
+        Course.query.options(joinedload(Course.dept)).filter(Course.id.in_(course_ids))
+    }
 
-        # create course object and append to list if not already in list
+    # create course objects in the order the prof's courses were listed
+    courses = []
+    for course_id in course_ids:
+        course = courses_by_id[course_id]
         dept = course.dept
         course_obj = {
             'id': course.id,
@@ -170,43 +172,16 @@ def get_semester():
     Returns:
         semesters (dict): Returns a mapping from current, next, and future to the corresponding semester
     """
-    with open('input_data/semester.txt') as f:
-        semesters = json.load(f)
-        for key, value in semesters.items():
-            if key == "current" or key == "future":
-                if value is not None:
-                    year = value[0:-1]
-                    if value[-1] == '2':
-                        semesters[key] = f'Spring {year}'
-                    elif value[-1] == '6':
-                        semesters[key] = f'Summer {year}'
-                    elif value[-1] == '9':
-                        semesters[key] = f'Fall {year}'
-                else:
-                    semesters[key] = None
-            elif key == "next":
-                if semesters["current"] is None:
-                    semesters[key] = None
-                else:
-                    current_sem = semesters["current"].split()
-
-                    future_sem_year = ""
-                    future_sem_sem = ""
-                    if(current_sem[0] == "Fall"):
-                        future_sem_year = str(int(current_sem[1]) + 1)
-                        future_sem_sem = "Spring"
-                    elif(current_sem['sem'] == "Spring"):
-                        future_sem_year = current_sem[1]
-                        future_sem_sem = "Summer"
-                    elif(current_sem['sem'] == "Summer"):
-                        future_sem_year = current_sem[1]
-                        future_sem_sem = "Fall"
-                    
-                    semesters[key] = future_sem_sem + " " + future_sem_year
-
-        return semesters
-
-    return None
+    current, _, future = current_semesters()
+    cur_year, cur_sem = split_semester(current)
+
+    semesters = {
+        "current": semester_string(cur_year, cur_sem),
+        "next": semester_string(*following_semester(cur_year, cur_sem)),
+        "future": semester_string(*split_semester(future))
+    }
+
+    return semesters
 
 
 @app.route('/api/get_profs', methods=['POST'])
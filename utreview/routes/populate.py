@@ -1,22 +1,56 @@
 """
 This file contains routes to populate courses/profs on the search results page:
     populate_results,
+    autocomplete,
+    search_results,
     populate_all,
-    populate_search
+    populate_search,
+    search_cache_stats
 """
 
-from flask import request, jsonify
+import base64
+import gzip
+import json
+from collections import defaultdict
+from flask import request, jsonify, Response, stream_with_context
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import joinedload
+from decouple import config
 from utreview.models import *
-from utreview import app, course_ix, prof_ix
+from utreview import app, db, course_ix, prof_ix
+from utreview.services.autocomplete import get_catalog_prefixes
+from utreview.services.catalog import CatalogSnapshot, catalog_version
+from utreview.services.fuzzy_index import get_catalog_fuzzy
+from utreview.services.ngram_index import get_catalog_ngrams, normalize_key
+from utreview.services.query_cache import QueryCache
+from utreview.services.ranking import rank_ids, SEARCH_TOP_K
 from whoosh.fields import *
 from whoosh.qparser import QueryParser
-import time
-from .course_info import get_ecis
 
-@app.route('/api/populate_results', methods=['POST'])
+# sort orders for paginated search results
+SEARCH_SORTS = ('relevance', 'numRatings', 'approval')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# number of autocomplete suggestions per entity type
+DEFAULT_SUGGESTIONS = 8
+MAX_SUGGESTIONS = 25
+
+# cursor position of a result list that has no more pages
+CURSOR_END = 'end'
+
+# max number of ids per query when fetching the sort values of search results
+SORT_BATCH_SIZE = 500
+
+# cache of the ranked search results for popular queries (populate_search and search_results pages)
+search_cache = QueryCache(config("SEARCH_CACHE_SIZE", default=1024, cast=int),
+                          config("SEARCH_CACHE_TTL", default=300, cast=float))
+
+@app.route('/api/populate_results', methods=['GET', 'POST'])
 def populate_results():
     """
     Returns a list of courses and profs based on a search value
+    An empty search (or a GET request) returns the catalog snapshot, which supports conditional GET through its ETag
 
     Args:
         searchValue (string): user input into search field
@@ -46,101 +80,446 @@ def populate_results():
                     }
             }
     """
-    s_time = time.time()
     #  parse request search
-    search = request.get_json()['searchValue'].lower().strip()
+    search = request.get_json()['searchValue'].lower().strip() if request.method == 'POST' else ""
+
+    # if empty search, then all courses
+    if search == "":
+        return catalog_response()
+
+    courses_list, profs_list = populate_search(search)
+    result = jsonify({"courses": courses_list, "profs": profs_list})
+
+    return result
 
-    # initialize list
-    courses_list = []
-    profs_list = []
 
-    # filter query lists
-    courses_query = [course for course in Course.query.all() if course.topic_num <=0]
+@app.route('/api/autocomplete', methods=['POST'])
+def autocomplete():
+    """
+    Returns the courses and profs whose code or name starts with the search value.
+    Only ids and labels are returned, so no rows are loaded from the database
+
+    Args:
+        searchValue (string): user input into search field
+        limit (int): max number of courses and number of profs
+
+    Returns:
+        result (json): Contains suggested courses and profs
+            {
+                "courses" (list): list of {'id' (int): course id, 'label' (string): course code and title}
+                "profs" (list): list of {'id' (int): prof id, 'label' (string): prof name}
+            }
+    """
+    args = request.get_json()
+    search = args.get('searchValue') or ""
+    try:
+        limit = min(max(int(args.get('limit') or DEFAULT_SUGGESTIONS), 1), MAX_SUGGESTIONS)
+    except (ValueError, TypeError):
+        limit = DEFAULT_SUGGESTIONS
+
+    course_prefixes, prof_prefixes = get_catalog_prefixes()
+    courses = [{'id': course_id, 'label': label} for course_id, label in course_prefixes.search(search, limit)]
+    profs = [{'id': prof_id, 'label': label} for prof_id, label in prof_prefixes.search(search, limit)]
+
+    return jsonify({"courses": courses, "profs": profs})
+
+
+def build_catalog():
+    """
+    Build the payload returned for an empty search
+
+    Returns:
+        catalog (object): all courses and profs
+            {
+                "courses" (list): list of all courses (excluding child topics)
+                "profs" (list): list of all profs
+            }
+    """
+    courses_query = Course.query.options(joinedload(Course.dept)).filter(Course.topic_num <= 0).all()
     profs_query = Prof.query.all()
+    courses_list, profs_list = populate_all(courses_query, profs_query)
+
+    return {"courses": courses_list, "profs": profs_list}
+
+
+catalog_snapshot = CatalogSnapshot(build_catalog)
+
+
+def catalog_response():
+    """
+    Serve the catalog snapshot, gzip-compressed if the client accepts it.
+    Returns 304 Not Modified for GET requests whose If-None-Match matches the snapshot ETag
+
+    Returns:
+        result (response): response containing the catalog payload
+    """
+    etag, body = catalog_snapshot.get()
+
+    if 'gzip' in request.accept_encodings:
+        result = Response(body, mimetype='application/json')
+        result.headers['Content-Encoding'] = 'gzip'
+    else:
+        result = Response(gzip.decompress(body), mimetype='application/json')
+
+    result.headers['Vary'] = 'Accept-Encoding'
+    result.set_etag(etag)
+
+    return result.make_conditional(request)
+
+
+@app.route('/api/search_results', methods=['POST'])
+def search_results():
+    """
+    Returns one page of the courses and profs matching a search value.
+    The page is streamed row by row, so the full result list is never held in memory
+
+    Args:
+        searchValue (string): user input into search field
+        sort (string): one of SEARCH_SORTS, defaults to relevance
+        pageSize (int): number of courses and number of profs per page
+        cursor (string): nextCursor from the previous page, None for the first page
+
+    Returns:
+        result (json): Contains a page of courses and profs
+            {
+                "courses" (list): list of course objects (see populate_results)
+                "profs" (list): list of prof objects (see populate_results)
+                "nextCursor" (string): cursor for the next page, None if there are no more results
+            }
+    """
+    # parse request arguments
+    args = request.get_json()
+    search = (args.get('searchValue') or "").lower().strip()
+    sort = args.get('sort') if args.get('sort') in SEARCH_SORTS else SEARCH_SORTS[0]
+    try:
+        page_size = min(max(int(args.get('pageSize') or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    except (ValueError, TypeError):
+        page_size = DEFAULT_PAGE_SIZE
+    cursor = decode_cursor(args.get('cursor'), search, sort)
 
-    # if empty search, then all courses
     if search == "":
-        courses_list, profs_list = populate_all(courses_query, profs_query)
+        course_page = page_catalog(Course, sort, cursor['courses'], page_size)
+        prof_page = page_catalog(Prof, sort, cursor['profs'], page_size)
     else:
-        courses_list, profs_list = populate_search(courses_query, profs_query, search)
-    
-    result = jsonify({"courses": courses_list, "profs": profs_list})
+        # page over the sorted ids cached by the first page, the search and the sort only run once per query
+        course_ids, prof_ids = sorted_search(search, sort)
+        course_page = page_search(Course, course_ids, cursor['courses'], page_size)
+        prof_page = page_search(Prof, prof_ids, cursor['profs'], page_size)
 
-    return result
+    return Response(stream_with_context(stream_page(course_page, prof_page, search, sort)),
+                    mimetype='application/json')
 
 
-def populate_search(courses_query, profs_query, search):
+def encode_cursor(search, sort, course_pos, prof_pos):
     """
-    Given a search value, search, return all profs and courses that relate to the search
+    Encode the position of the last courses/profs returned into an opaque cursor
+
+    Args:
+        search (string): search value the cursor belongs to
+        sort (string): sort order the cursor belongs to
+        course_pos: position after the last course returned, CURSOR_END if there are no more courses
+        prof_pos: position after the last prof returned, CURSOR_END if there are no more profs
+
+    Returns:
+        cursor (string): url-safe cursor, None if there are no more results
+    """
+    if(course_pos == CURSOR_END and prof_pos == CURSOR_END):
+        return None
+
+    cursor = json.dumps({'search': search, 'sort': sort, 'courses': course_pos, 'profs': prof_pos})
+    return base64.urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, search, sort):
+    """
+    Decode a cursor made by encode_cursor. Cursors made for another search or sort start from the first page
+
+    Args:
+        cursor (string): cursor sent by the front end
+        search (string): current search value
+        sort (string): current sort order
+
+    Returns:
+        positions (dict): mapping from 'courses'/'profs' to the position to continue from (None for the start)
+    """
+    positions = {'courses': None, 'profs': None}
+    if(not cursor):
+        return positions
+
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError):
+        return positions
+
+    if(decoded.get('search') == search and decoded.get('sort') == sort):
+        positions['courses'] = decoded.get('courses')
+        positions['profs'] = decoded.get('profs')
+
+    return positions
+
+
+def sort_key(model, sort):
+    """
+    Get the integer expression a sort order ranks by (higher first), None for relevance.
+    Approval is scaled to an integer so cursor values compare exactly
+
+    Args:
+        model (model class): Course or Prof
+        sort (string): sort order
+
+    Returns:
+        key (column expression): sort value with nulls ranked last
+    """
+    if(sort == 'numRatings'):
+        return func.coalesce(model.num_ratings, 0)
+    elif(sort == 'approval'):
+        return func.round(func.coalesce(model.approval, -1) * 10000)
+    return None
+
+
+def page_catalog(model, sort, after, page_size):
+    """
+    Generate one page of all courses/profs with a keyset query on (sort value, id)
+
+    Args:
+        model (model class): Course or Prof
+        sort (string): sort order, relevance is id order for an empty search
+        after (list): [sort value, id] of the last row of the previous page, None for the first page
+        page_size (int): max number of rows
+
+    Yields:
+        (object, position): search result object and the position after it,
+        followed by (None, CURSOR_END) if this was the last page
+    """
+    if(after == CURSOR_END):
+        yield None, CURSOR_END
+        return
+
+    key = sort_key(model, sort)
+    query = model.query
+    if(model is Course):
+        query = query.options(joinedload(Course.dept)).filter(Course.topic_num <= 0)
+
+    # continue after the last row of the previous page
+    if(isinstance(after, list) and len(after) == 2):
+        if(key is None):
+            query = query.filter(model.id > after[1])
+        else:
+            query = query.filter(or_(key < after[0], and_(key == after[0], model.id > after[1])))
+
+    if(key is None):
+        query = query.add_columns(model.id).order_by(model.id)
+    else:
+        query = query.add_columns(key).order_by(key.desc(), model.id)
+    to_object = get_course_object if model is Course else get_prof_object
+
+    # fetch one extra row to know whether there is another page
+    num_rows = 0
+    for row, value in query.limit(page_size + 1):
+        num_rows += 1
+        if(num_rows > page_size):
+            return
+        yield to_object(row), [int(value), row.id]
+
+    yield None, CURSOR_END
+
+
+def page_search(model, ids, after, page_size):
+    """
+    Generate one page of the search results for courses/profs
+
+    Args:
+        model (model class): Course or Prof
+        ids (list): ids of the results in the order of the sort, see sorted_search
+        after (int): number of results returned by the previous pages, None for the first page
+        page_size (int): max number of rows
+
+    Yields:
+        (object, position): search result object and the position after it,
+        followed by (None, CURSOR_END) if this was the last page
+    """
+    if(after == CURSOR_END):
+        yield None, CURSOR_END
+        return
+
+    offset = after if isinstance(after, int) else 0
+    page_ids = ids[offset:offset + page_size]
+    rows = load_courses(page_ids) if model is Course else load_profs(page_ids)
+    to_object = get_course_object if model is Course else get_prof_object
+
+    for i, result_id in enumerate(page_ids):
+        if(result_id in rows):
+            yield to_object(rows[result_id]), offset + i + 1
+
+    if(offset + page_size >= len(ids)):
+        yield None, CURSOR_END
+    else:
+        yield None, offset + page_size
+
+
+def stream_page(course_page, prof_page, search, sort):
+    """
+    Encode a page of results as JSON one row at a time
+
+    Args:
+        course_page (generator): page of courses from page_catalog or page_search
+        prof_page (generator): page of profs from page_catalog or page_search
+        search (string): search value, used for the next cursor
+        sort (string): sort order, used for the next cursor
+
+    Yields:
+        chunk (string): next piece of the JSON response
+    """
+    positions = {}
+    for name, page in (('courses', course_page), ('profs', prof_page)):
+        yield ('{' if name == 'courses' else ',') + json.dumps(name) + ':['
+
+        first = True
+        for result_object, position in page:
+            positions[name] = position
+            if(result_object is None):
+                continue
+            yield ('' if first else ',') + json.dumps(result_object)
+            first = False
+
+        yield ']'
+
+    next_cursor = encode_cursor(search, sort, positions.get('courses', CURSOR_END), positions.get('profs', CURSOR_END))
+    yield ',"nextCursor":' + json.dumps(next_cursor) + '}'
+
+
+@app.route('/api/search_cache_stats', methods=['GET'])
+def search_cache_stats():
+    """
+    Returns the counters of the search result cache
+
+    Returns:
+        result (json): size, maxSize, ttl, hits, misses, evictions and hitRate of the cache
+    """
+    return jsonify(search_cache.stats())
+
+
+def populate_search(search):
+    """
+    Given a search value, search, return all profs and courses that relate to the search.
 
     Args:
-        courses_query (course query): all courses in the database
-        profs_query (prof query): all profs in the database
         search (string): user search value
 
     Returns:
         courses_list (list), prof_list (list) : list of courses and profs respectively
     """
-    # initialize lists to store courses/profs
-    courses_list = []
-    profs_list = []
-    course_ids = []
-    prof_ids = []
-    search_tokens = search.split()
+    return cached_search(search)[2]
 
-    # use search engine library to search through courses with search token
-    with course_ix.searcher() as searcher:
-        query = QueryParser("content", course_ix.schema).parse(search)
-        results = searcher.search(query, limit=50)
 
-        # add result to course list if not already added
-        for result in results:
-            course_id = int(result["index"])
-            if(course_id in course_ids):
-                continue
-            else:
-                course_ids.append(course_id)
-                course = Course.query.filter_by(id=course_id).first()
-                append_course(course, courses_list, profs_list, prof_ids)
+def cached_search(search):
+    """
+    Get the search results of a search value, shared by populate_search and every page of search_results.
+    Results are cached until the search indexes or the catalog change.
+    Review writes do not invalidate them, so the ratings of cached results lag by at most the cache ttl
 
-    # check if search value is a substring of a course name         
-    for course in courses_query:
-        course_str = course.dept.abr + course.num
-        course_str = course_str.lower().replace(" ", "")
+    Args:
+        search (string): user search value
 
-        if search.replace(" ", "") in course_str:
-            if(course.id in course_ids):
-                continue
-            else:
-                course_ids.append(course.id)
-                append_course(course, courses_list, profs_list, prof_ids)
-
-    # use search engine library to search through profs with search token
-    with prof_ix.searcher() as searcher:
-        query = QueryParser("content", prof_ix.schema).parse(search)
-        results = searcher.search(query, limit=50)
-
-        # add result to prof list if not already added
-        for result in results:
-            prof_id = int(result["index"])
-            if(prof_id in prof_ids):
-                continue
-            else:
-                prof_ids.append(prof_id)
-                prof = Prof.query.filter_by(id=prof_id).first()
-                append_prof(prof, profs_list, courses_list, course_ids)
+    Returns:
+        course_ids (list), prof_ids (list), results (tuple): ranked ids of all matching courses and profs,
+        and the courses_list and profs_list of populate_search
+    """
+    search = " ".join(search.split())
+    key = search_cache_key(search)
 
-    # check if search value is substring of prof name
-    for prof in profs_query:
-        prof_str = prof.first_name + prof.last_name
-        prof_str = prof_str.lower().replace(" ", "")
+    result = search_cache.get(key)
+    if(result is None):
+        result = compute_search(search)
+        search_cache.put(key, result)
 
-        if search.replace(" ", "") in prof_str:
-            if(prof.id in prof_ids):
-                continue
-            else:
-                prof_ids.append(prof.id)
-                append_prof(prof, profs_list, courses_list, course_ids)
+    return result
+
+
+def search_cache_key(search):
+    """
+    Get the search cache key of a search value: everything the search results depend on
+
+    Args:
+        search (string): normalized user search value
+
+    Returns:
+        key (tuple): search value, index generations and catalog version
+    """
+    return (search, course_ix.latest_generation(), prof_ix.latest_generation(), catalog_version())
+
+
+def sorted_search(search, sort):
+    """
+    Get the ids of the search results of a search value in the order of a sort.
+    The sorted ids are cached next to the ranked ids, so every page only slices them
+
+    Args:
+        search (string): user search value
+        sort (string): one of SEARCH_SORTS
+
+    Returns:
+        course_ids (list), prof_ids (list): ids of all matching courses and profs, in sort order
+    """
+    course_ids, prof_ids, _ = cached_search(search)
+    if(sort_key(Course, sort) is None):
+        return course_ids, prof_ids
+
+    key = search_cache_key(" ".join(search.split())) + (sort,)
+    result = search_cache.get(key)
+    if(result is None):
+        result = (sort_ids(Course, course_ids, sort), sort_ids(Prof, prof_ids, sort))
+        search_cache.put(key, result)
+
+    return result
+
+
+def sort_ids(model, ids, sort):
+    """
+    Order search result ids by a sort value, keeping the ranked order between ties
+
+    Args:
+        model (model class): Course or Prof
+        ids (list): ids of the results in ranked order
+        sort (string): sort order other than relevance
+
+    Returns:
+        ids (list): ids in sort order
+    """
+    key = sort_key(model, sort)
+    values = {}
+    for i in range(0, len(ids), SORT_BATCH_SIZE):
+        batch = ids[i:i + SORT_BATCH_SIZE]
+        values.update(db.session.query(model.id, key).filter(model.id.in_(batch)))
+
+    return sorted(ids, key=lambda result_id: -values.get(result_id, -1))
+
+
+def compute_search(search):
+    """
+    Run the search pipeline for a search value
+
+    Args:
+        search (string): normalized user search value
+
+    Returns:
+        course_ids (list), prof_ids (list), results (tuple): ranked ids of all matching courses and profs,
+        and the courses_list and profs_list of the best SEARCH_TOP_K of each
+    """
+    course_ids, prof_ids = search_result_ids(search)
+
+    # rank all candidates once, but only load the best ones
+    course_ids = rank_ids(Course, course_ids)
+    prof_ids = rank_ids(Prof, prof_ids)
+    top_course_ids = course_ids[:SEARCH_TOP_K]
+    top_prof_ids = prof_ids[:SEARCH_TOP_K]
+
+    # load all results at once
+    courses = load_courses(top_course_ids)
+    profs = load_profs(top_prof_ids)
+
+    courses_list = [get_course_object(courses[course_id]) for course_id in top_course_ids if course_id in courses]
+    profs_list = [get_prof_object(profs[prof_id]) for prof_id in top_prof_ids if prof_id in profs]
 
     # check if no results found
     if(len(courses_list) < 1):
@@ -148,7 +527,147 @@ def populate_search(courses_query, profs_query, search):
     if(len(profs_list) < 1):
         profs_list = "empty"
 
-    return courses_list, profs_list
+    return course_ids, prof_ids, (courses_list, profs_list)
+
+
+def search_result_ids(search):
+    """
+    Given a search value, find the ids of all profs and courses that relate to the search in relevance order.
+    Matching courses come with the profs that teach them and matching profs with the courses they teach
+
+    Args:
+        search (string): user search value
+
+    Returns:
+        course_ids (list), prof_ids (list): ids of courses and profs respectively
+    """
+    course_ngrams, prof_ngrams = get_catalog_ngrams()
+
+    # collect matching course/prof ids: search engine results first, then those containing the search value
+    course_hits = unique_ids(search_ix(course_ix, search), course_ngrams.search(normalize_key(search)))
+    prof_hits = unique_ids(search_ix(prof_ix, search), prof_ngrams.search(normalize_key(search)))
+
+    # fall back to typo tolerant matching when the exact matches found nothing
+    if(len(course_hits) == 0 or len(prof_hits) == 0):
+        course_fuzzy, prof_fuzzy = get_catalog_fuzzy()
+        if(len(course_hits) == 0):
+            course_hits = course_fuzzy.search(search)
+        if(len(prof_hits) == 0):
+            prof_hits = prof_fuzzy.search(search)
+
+    # find the profs of the matching courses and the courses of the matching profs in one query
+    profs_by_course = defaultdict(list)
+    courses_by_prof = defaultdict(list)
+    if(len(course_hits) > 0 or len(prof_hits) > 0):
+        prof_courses = db.session.query(ProfCourse.course_id, ProfCourse.prof_id) \
+            .filter(or_(ProfCourse.course_id.in_(course_hits), ProfCourse.prof_id.in_(prof_hits))) \
+            .order_by(ProfCourse.id)
+        for course_id, prof_id in prof_courses:
+            profs_by_course[course_id].append(prof_id)
+            courses_by_prof[prof_id].append(course_id)
+
+    course_ids = []
+    prof_ids = []
+    course_seen = set()
+    prof_seen = set()
+
+    # add courses, along with the profs that teach them
+    for course_id in course_hits:
+        for prof_id in profs_by_course[course_id]:
+            if(prof_id not in prof_seen):
+                prof_seen.add(prof_id)
+                prof_ids.append(prof_id)
+        course_seen.add(course_id)
+        course_ids.append(course_id)
+
+    # add profs if not already added, along with the courses they teach
+    for prof_id in prof_hits:
+        if(prof_id in prof_seen):
+            continue
+        for course_id in courses_by_prof[prof_id]:
+            if(course_id not in course_seen):
+                course_seen.add(course_id)
+                course_ids.append(course_id)
+        prof_seen.add(prof_id)
+        prof_ids.append(prof_id)
+
+    return course_ids, prof_ids
+
+
+def unique_ids(*id_lists):
+    """
+    Concatenate lists of ids, dropping duplicates but keeping the order of first appearance
+
+    Args:
+        id_lists (list): lists of ids
+
+    Returns:
+        ids (list): unique ids
+    """
+    ids = []
+    seen = set()
+    for id_list in id_lists:
+        for doc_id in id_list:
+            if(doc_id not in seen):
+                seen.add(doc_id)
+                ids.append(doc_id)
+
+    return ids
+
+
+def search_ix(ix, search, limit=50):
+    """
+    Use the search engine library to find the documents matching the search value
+
+    Args:
+        ix (index): course or prof search index
+        search (string): user search value
+        limit (int): max number of results
+
+    Returns:
+        ids (list): ids of matching documents, best match first
+    """
+    with ix.searcher() as searcher:
+        query = QueryParser("content", ix.schema).parse(search)
+        ids = [int(result["index"]) for result in searcher.search(query, limit=limit)]
+
+    return unique_ids(ids)
+
+
+def load_courses(course_ids):
+    """
+    Load courses by id along with their dept in one query
+
+    Args:
+        course_ids (list): course ids to load
+
+    Returns:
+        courses (dict): mapping from course id to course
+    """
+    if(len(course_ids) == 0):
+        return {}
+
+    courses = Course.query.options(joinedload(Course.dept)).filter(Course.id.in_(course_ids))
+
+    return {course.id: course for course in courses}
+
+
+def load_profs(prof_ids):
+    """
+    Load profs by id in one query
+
+    Args:
+        prof_ids (list): prof ids to load
+
+    Returns:
+        profs (dict): mapping from prof id to prof
+    """
+    if(len(prof_ids) == 0):
+        return {}
+
+    profs = Prof.query.filter(Prof.id.in_(prof_ids))
+
+    return {prof.id: prof for prof in profs}
 
 
 def populate_all(courses_query, profs_query):
@@ -162,75 +681,26 @@ def populate_all(courses_query, profs_query):
     Returns:
         courses_list (list), prof_list (list) : list of courses and profs respectively
     """
-    # intialize lists to store courses/profs
-    s_time = time.time()
-    courses_list = []
-    profs_list = []
-
-    # for every course in the database, add to courses list
-    for course in courses_query:
-        dept = course.dept
-        course_object = {
-            'id': course.id,
-            'courseDept': dept.abr,
-            'courseNum': course.num,
-            'courseTitle': course.title,
-            'courseTopic': course.topic_num,
-            'approval': round(course.approval, 2) * 100 if course.approval != None else None,
-            'eCIS': round(course.ecis_avg, 1) if course.ecis_avg != None else None,
-            'numRatings': course.num_ratings,
-            'semesters': (course.current_sem, course.next_sem, course.future_sem)
-        }
-        courses_list.append(course_object)
-
-    # for every prof in the database, add to profs list
-    for prof in profs_query:
-        prof_object = {
-            'id': prof.id,
-            'firstName': prof.first_name,
-            'lastName': prof.last_name,
-            'approval': round(prof.approval, 2) * 100 if prof.approval != None else None,
-            'eCIS': round(prof.ecis_avg, 1) if prof.ecis_avg != None else None,
-            'numRatings': prof.num_ratings,
-            'semesters': (prof.current_sem, prof.next_sem, prof.future_sem)
-        }
-        profs_list.append(prof_object)
+    # for every course/prof in the database, add to courses/profs list
+    courses_list = [get_course_object(course) for course in courses_query]
+    profs_list = [get_prof_object(prof) for prof in profs_query]
 
     return courses_list, profs_list
 
-def append_course(course, courses_list, profs_list, prof_ids):
+
+def get_course_object(course):
     """
-    Add a course object made from course to the courses_list,
-    also add related professors to the profs_list
+    Build the search result object for a course
 
     Args:
-        course (model instance): course we want to add to the list
-        courses_list (list): list of current courses
-        profs_list (list): list of current profs
-        prof_ids (list): list of current prof ids (to check for duplicates)
-    """
-    # for all the profs that teach the course, add it to profs list if not already there
-    dept = course.dept
-    for course_pc in course.prof_course:
-        prof = course_pc.prof
-        if(prof.id in prof_ids):
-            continue
-        prof_ids.append(prof.id)
-        prof_object = {
-            'id': prof.id,
-            'firstName': prof.first_name,
-            'lastName': prof.last_name,
-            'approval': round(prof.approval, 2) * 100 if prof.approval != None else None,
-            'eCIS': round(prof.ecis_avg, 1) if prof.ecis_avg != None else None,
-            'numRatings': prof.num_ratings,
-            'semesters': (prof.current_sem, prof.next_sem, prof.future_sem)
-        }
-        profs_list.append(prof_object)
-
-    # add course object to courses list
+        course (model instance): course
+
+    Returns:
+        course_object (object): course search result
+    """
     course_object = {
         'id': course.id,
-        'courseDept': dept.abr,
+        'courseDept': course.dept.abr,
         'courseNum': course.num,
         'courseTitle': course.title,
         'courseTopic': course.topic_num,
@@ -239,41 +709,20 @@ def append_course(course, courses_list, profs_list, prof_ids):
         'numRatings': course.num_ratings,
         'semesters': (course.current_sem, course.next_sem, course.future_sem)
     }
-    courses_list.append(course_object)
+
+    return course_object
 
 
-def append_prof(prof, profs_list, courses_list, course_ids):
+def get_prof_object(prof):
     """
-    Add a prof object made from prof to the profs_list,
-    also add related courses to the courses_list
+    Build the search result object for a prof
 
     Args:
-        prof (model instance): prof we want to add to the list
-        courses_list (list): list of current courses
-        profs_list (list): list of current profs
-        course_ids (list): list of current course ids (to check for duplicates)
-    """
-    # for all the courses taught by the prof, add it to courses list if not already there
-    for prof_pc in prof.prof_course:
-        course = prof_pc.course
-        dept = course.dept
-        if(course.id in course_ids):
-            continue
-        course_ids.append(course_ids)
-        course_object = {
-            'id': course.id,
-            'courseDept': dept.abr,
-            'courseNum': course.num,
-            'courseTitle': course.title,
-            'courseTopic': course.topic_num,
-            'approval': round(course.approval, 2) * 100 if course.approval != None else None,
-            'eCIS': round(course.ecis_avg, 1) if course.ecis_avg != None else None,
-            'numRatings': course.num_ratings,
-            'semesters': (course.current_sem, course.next_sem, course.future_sem)
-        }
-        courses_list.append(course_object)
-
-    # add prof object to profs list
+        prof (model instance): prof
+
+    Returns:
+        prof_object (object): prof search result
+    """
     prof_object = {
         'id': prof.id,
         'firstName': prof.first_name,
@@ -283,4 +732,5 @@ def append_prof(prof, profs_list, courses_list, course_ids):
         'numRatings': prof.num_ratings,
         'semesters': (prof.current_sem, prof.next_sem, prof.future_sem)
     }
-    profs_list.append(prof_object)
\ No newline at end of file
+
+    return prof_object
@@ -10,9 +10,16 @@ import timeago, datetime
 import json
 from flask import request, jsonify
 from utreview.models import *
-from .course_info import get_ecis, time_to_string
-from .catalyst import prof_median_grade
+from .course_info import get_prof_course_ecis, time_to_string
 from utreview import app
+from utreview.database.load_pages import (
+    load_cross_listed,
+    load_prof_review_page,
+    load_prof_page,
+    load_prof_review_votes,
+    load_prof_scheduled
+)
+from utreview.services.semester import get_semesters, schedule_semesters
 from whoosh.fields import *
 
 @app.route('/api/prof_id', methods=['POST'])
@@ -85,7 +92,8 @@ def prof_details():
             "prof_rating" (object): prof average ratings
             "prof_courses" (list): list of courses taught by the prof
             "prof_schedule" (object): prof schedule
-            "prof_reviews" (list): list of reviews for the prof
+            "prof_reviews" (list): first page of reviews for the prof (newest first)
+            "prof_reviews_cursor" (string): cursor of the next page of reviews for /api/reviews, None if no more reviews
     """
     # get args from front end
     prof_id = request.get_json()['profId']
@@ -98,9 +106,9 @@ def prof_details():
     else:
         curr_user = None
 
-    # get basic prof info and median grade
-    prof = Prof.query.filter_by(id=prof_id).first()
-    median_grade = prof_median_grade(prof.first_name, prof.last_name)
+    # get basic prof info and median grade, along with the courses taught by the prof
+    prof = load_prof_page(prof_id)
+    median_grade = prof.median_grade
     prof_info = {
         "id": prof.id,
         "firstName": prof.first_name,
@@ -109,7 +117,7 @@ def prof_details():
     }
 
     # get other more detailed prof info
-    prof_rating, review_list = get_prof_reviews(prof, logged_in, curr_user)
+    prof_rating, review_list, review_cursor = get_prof_reviews(prof, logged_in, curr_user)
     prof_schedule = get_prof_schedule(prof)
     course_list = get_prof_courses(prof)
 
@@ -118,16 +126,18 @@ def prof_details():
                       "prof_rating": prof_rating,
                       "prof_courses": course_list,
                       "prof_schedule": prof_schedule,
-                      "prof_reviews": review_list,})
+                      "prof_reviews": review_list,
+                      "prof_reviews_cursor": review_cursor})
 
     return result
 
-def get_scheduled_prof(scheduled_prof):
+def get_scheduled_prof(scheduled_prof, x_listed_courses=()):
     """
     Obtain information for the scheduled prof
 
     Args:
         scheduled_prof (model instance): scheduled prof
+        x_listed_courses (list): courses cross listed with the scheduled prof, see load_cross_listed
 
     Returns:
         scheduled_obj (obj): Contains detailed information about the scheduled prof
@@ -164,25 +174,8 @@ def get_scheduled_prof(scheduled_prof):
     elif(scheduled_prof.semester.semester == 9):
         semester_name = "Fall"
 
-    # obtain list of all cross listed courses
-    x_listed = []
-    x_listed_ids = []
-    x_listed_ids.append(scheduled_prof.course.id)
-
-    # iterate through all cross listed courses and append to list
-    if(scheduled_prof.xlist is not None):
-        for x_course in scheduled_prof.xlist.courses:
-            if(x_course.course.id in x_listed_ids):
-                continue
-            x_listed.append(x_course.course.id)
-            x_listed_obj = {
-                'id': x_course.course.id,
-                'dept': x_course.course.dept.abr,
-                'num': x_course.course.num,
-                'title': x_course.course.title,
-                'topicNum': x_course.course.topic_num
-            }
-            x_listed.append(x_listed_obj)
+    # obtain list of all cross listed courses, excluding the course itself
+    x_listed = [x_listed_obj for x_listed_obj in x_listed_courses if x_listed_obj['id'] != scheduled_prof.course_id]
 
     # return object with scheduled prof information
     scheduled_obj = {
@@ -219,56 +212,23 @@ def get_prof_schedule(prof):
             "futureSem" (list): list of scheduled prof for the future semester
         }
     """
-    # current and future semester, as labeled by FTP, update manually
-    with open('input_data/semester.txt') as f:
-        semesters = json.load(f)
-        
-    current_sem = {
-        'year': int(semesters['current'][0:-1]) if semesters['current'] is not None else None,
-        'sem': int(semesters['current'][-1]) if semesters['current'] is not None else None
-    }
-
-    future_sem_year = None
-    future_sem_sem = None
-    if(current_sem['year'] is not None):
-        if(current_sem['sem'] == 9):
-            future_sem_year = current_sem['year'] + 1
-            future_sem_sem = 2
-        elif(current_sem['sem'] == 2):
-            future_sem_year = current_sem['year']
-            future_sem_sem = 6
-        elif(current_sem['sem'] == 6):
-            future_sem_year = current_sem['year']
-            future_sem_sem = 9
-
-    future_sem = {
-        'year': future_sem_year,
-        'sem': future_sem_sem
-    }
-
-    # decide to whether to display courses that have mark_deletion = False or mark_deletion = None
-    mark_false = True
-    scheduled = ScheduledCourse.query.filter_by(mark_deletion=None, prof_id=prof.id)
-    if(scheduled.count() > 0):
-        mark_false = False
+    # current and future semester, as labeled by FTP, kept in memory by the semester service
+    semesters = get_semesters()
+    current_sem, future_sem = schedule_semesters()
 
     # obtain list of scheduled profs for current and future semesters
     current_list = []
     future_list = []
-    profs_scheduled_list = []
 
-    for i in range(len(prof.scheduled)):
-        if(mark_false):
-            if(prof.scheduled[i].mark_deletion != False):
-                continue
-        else:
-            if(prof.scheduled[i].mark_deletion != None):
-                continue
-        profs_scheduled_list.append(prof.scheduled[i])
+    # load the sections of the two semesters in one query (mark_deletion = None, or False while the FTP update runs)
+    profs_scheduled_list = load_prof_scheduled(prof.id, [current_sem, future_sem])
+
+    # resolve the cross listed courses of every section in one query
+    x_listed = load_cross_listed(profs_scheduled_list)
 
     # for each scheduled prof instance, get scheduled prof information and append it to corresponding list
     for scheduled_prof in profs_scheduled_list:
-        scheduled_obj = get_scheduled_prof(scheduled_prof)
+        scheduled_obj = get_scheduled_prof(scheduled_prof, x_listed.get(scheduled_prof.cross_listed, []))
         if(scheduled_prof.semester.year == current_sem['year'] and
         scheduled_prof.semester.semester == current_sem['sem']):
             current_list.append(scheduled_obj)
@@ -288,7 +248,7 @@ def get_prof_schedule(prof):
 
     return prof_schedule
 
-def get_review_info(review, logged_in, curr_user):
+def get_review_info(review, logged_in, curr_user, liked_ids=frozenset(), disliked_ids=frozenset()):
     """
     Get review information for a particular review instance
 
@@ -300,6 +260,8 @@ def get_review_info(review, logged_in, curr_user):
         grading (int): average grading over all reviews
         logged_in (boolean): tells whether user is logged in
         curr_user (model instance): currently logged in user
+        liked_ids (set): ids of the reviews the current user liked
+        disliked_ids (set): ids of the reviews the current user disliked
 
     Returns:
         review_object (object): Object containing detailed information about the review
@@ -349,24 +311,12 @@ def get_review_info(review, logged_in, curr_user):
     user_first_name = user.first_name
     user_last_name = user.last_name
 
-    num_liked = 0
-    num_disliked = 0
-    like_pressed = False
-    dislike_pressed = False
-
-    # calculate number of likes and determine if current user liked the review
-    for like in prof_review.users_liked:
-        num_liked += 1
-        if(logged_in):
-            if(curr_user.id == like.user_id):
-                like_pressed = True
-
-    # calulcate number of dislikes and determine if current user disliked the review
-    for dislike in prof_review.users_disliked:
-        num_disliked += 1
-        if(logged_in):
-            if(curr_user.id == dislike.user_id):
-                dislike_pressed = True
+    num_liked = prof_review.num_liked
+    num_disliked = prof_review.num_disliked
+
+    # determine if current user liked or disliked the review
+    like_pressed = prof_review.id in liked_ids
+    dislike_pressed = prof_review.id in disliked_ids
     
     # if the review comment is empty, return None
     if(prof_review.comments == ""):
@@ -403,9 +353,33 @@ def get_review_info(review, logged_in, curr_user):
 
     return review_object
 
+def get_review_list(review_rows, logged_in, curr_user):
+    """
+    Get review information for a page of prof reviews
+
+    Args:
+        review_rows (list): prof reviews of the page
+        logged_in (boolean): tells whether user is logged in
+        curr_user (model instance): currently logged in user
+
+    Returns:
+        review_list (list): review objects of the page, see get_review_info
+    """
+    # obtain the current user's votes on these reviews in one query
+    liked_ids, disliked_ids = load_prof_review_votes(curr_user if logged_in else None,
+                                                     [prof_review.id for prof_review in review_rows])
+
+    review_list = []
+    for prof_review in review_rows:
+        review_object = get_review_info(prof_review.review, logged_in, curr_user, liked_ids, disliked_ids)
+        if review_object:
+            review_list.append(review_object)
+
+    return review_list
+
 def get_prof_reviews(prof, logged_in, curr_user):
     """
-    Get information for all reviews of the prof
+    Get the rating of the prof and the first page of its reviews
 
     Args:
         prof (model instance): prof
@@ -422,18 +396,12 @@ def get_prof_reviews(prof, logged_in, curr_user):
                 'grading' (float): average grading
                 'numRatings' (int): number of ratings
             }
-        review_list (list): list of all reviews for the prof
+        review_list (list): newest reviews for the prof, the rest are fetched from /api/reviews
+        review_cursor (string): cursor of the next page of reviews, None if there are no more reviews
     """
-    # obtain list of prof reviews
-    prof_reviews = prof.reviews
-    review_list = []
-
-    # iterate through all prof reviews and add to review list
-    for prof_review in prof_reviews:
-        review = prof_review.review
-        review_object = get_review_info(review, logged_in, curr_user)
-        if review_object:
-            review_list.append(review_object)
+    # obtain the first page of prof reviews
+    review_rows, review_cursor = load_prof_review_page(prof.id)
+    review_list = get_review_list(review_rows, logged_in, curr_user)
     
     # return prof rating information
     prof_rating = {
@@ -445,7 +413,7 @@ def get_prof_reviews(prof, logged_in, curr_user):
         'numRatings': prof.num_ratings
     }
 
-    return prof_rating, review_list
+    return prof_rating, review_list, review_cursor
 
 def get_prof_courses(prof):
     """
@@ -472,47 +440,27 @@ def get_prof_courses(prof):
     course_list = []
     course_prof = prof.prof_course
 
+    # rating totals of the prof for each course in one query
+    stats_by_course = {stats.course_id: stats for stats in ProfCourseStats.query.filter_by(prof_id=prof.id)}
+
     # iterate through prof course instances and add to prof course list
     for prof_course in course_prof:
 
         course = prof_course.course
-        course_ecis, prof_ecis = get_ecis(course, prof)
-
-        prof_reviews = prof.reviews
-        course_reviews = course.reviews
-        review_ids = [prof_review.review_id for prof_review in prof_reviews]
-
-        # iterate through all prof reviews and calculate average metrics
-        reviews = []
-        for course_review in course_reviews:
-            if(course_review.review_id in review_ids):
-                reviews.append(course_review.review)
-        
-        # calculate average metrics  
-        if(len(reviews) == 0):
+        course_ecis, prof_ecis = get_prof_course_ecis(prof_course)
+        stats = stats_by_course.get(course.id)
+
+        # calculate average metrics
+        if(stats is None or stats.num_ratings <= 0):
             percentLiked = None
             difficulty = None
             usefulness = None
             workload = None
         else:
-            percentLiked = 0
-            difficulty = 0
-            usefulness = 0
-            workload = 0
-
-            # iterate through all the reviews
-            for review in reviews:
-                course_review = review.course_review[0]
-                if(course_review.approval):
-                    percentLiked += 1
-                difficulty += course_review.difficulty
-                usefulness += course_review.usefulness
-                workload += course_review.workload
-
-            percentLiked = round(percentLiked/len(reviews), 2) * 100
-            difficulty = round(difficulty/len(reviews), 1)
-            usefulness = round(usefulness/len(reviews), 1)
-            workload = round(workload/len(reviews), 1)
+            percentLiked = round(stats.course_approved/stats.num_ratings, 2) * 100
+            difficulty = round(stats.difficulty_total/stats.num_ratings, 1)
+            usefulness = round(stats.usefulness_total/stats.num_ratings, 1)
+            workload = round(stats.workload_total/stats.num_ratings, 1)
 
         # return object containing course information
         course_obj = {
@@ -13,6 +13,7 @@ from flask import request, jsonify
 from flask_jwt_extended import (create_access_token)
 from utreview.models import *
 from utreview import app, db
+from utreview.services.topic_map import get_topic_map
 from whoosh.fields import *
 
 @app.route('/api/update_personal_info', methods=['POST'])
@@ -300,12 +301,8 @@ def get_parent_id(topic_id):
     if(topic_id == None): 
         return None
 
-    topic = Topic.query.filter_by(id=topic_id).first()
-
     # find course where topic number is 0
-    for course in topic.courses:
-        if(course.topic_num == 0):
-            return course.id
+    return get_topic_map().parent_id(topic_id)
 
 @app.route('/api/get_profile_pic', methods=['GET'])
 def get_profile_pic():
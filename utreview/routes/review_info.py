@@ -6,11 +6,22 @@ This file contains all the routes related to reviews and the review form:
     delete_review
     review_error
     review_feedback
+    reviews
 """
 
 from flask import request, jsonify
 from utreview.models import *
 from utreview import app, db, bcrypt, jwt
+from utreview.database.load_pages import (
+    MAX_REVIEW_PAGE_SIZE,
+    REVIEW_PAGE_SIZE,
+    load_course_review_page,
+    load_prof_review_page
+)
+from utreview.services.catalog import bump_ratings_version
+from .course_info import get_topic_course_ids, is_parent_topic
+from .course_info import get_review_list as get_course_review_list
+from .prof_info import get_review_list as get_prof_review_list
 import datetime
 
 def semester_to_number(semester):
@@ -121,10 +132,10 @@ def save_review():
     # update review with new course review and prof review
     course_review = CourseReview(review_id=review.id, course_id=course.id, approval=course_approval,
                                 usefulness=course_usefulness, difficulty=course_difficulty, 
-                                workload=course_workload, comments=course_comments)
+                                workload=course_workload, comments=course_comments, date_posted=review.date_posted)
     prof_review = ProfReview(review_id=review.id, prof_id=prof.id, approval=prof_approval,
                             clear=prof_clear, engaging=prof_engaging, grading=prof_grading, 
-                            comments=prof_comments)
+                            comments=prof_comments, date_posted=review.date_posted)
 
     db.session.add(course_review)
     db.session.add(prof_review)
@@ -221,15 +232,19 @@ def new_review():
     # create new prof review and course review instances
     course_review = CourseReview(review_id=review.id, course_id=course.id, approval=course_approval,
                                  usefulness=course_usefulness, difficulty=course_difficulty, 
-                                 workload=course_workload, comments=course_comments)
+                                 workload=course_workload, comments=course_comments, date_posted=review.date_posted)
     prof_review = ProfReview(review_id=review.id, prof_id=prof.id, approval=prof_approval,
                                clear=prof_clear, engaging=prof_engaging, grading=prof_grading, 
-                               comments=prof_comments)
+                               comments=prof_comments, date_posted=review.date_posted)
 
     db.session.add(course_review)
     db.session.add(prof_review)
+    update_prof_course_stats(course_review, prof_review, 1)
     db.session.commit()
 
+    # course and prof ratings changed
+    bump_ratings_version()
+
     result_review = {
         'id': review.id,
         'user_email': user_email,
@@ -240,6 +255,42 @@ def new_review():
 
     return result
 
+def update_prof_course_stats(course_review, prof_review, change):
+    """
+    Adds (or removes) the ratings of a review to the totals of the prof teaching the course.
+    The row is created with an insert-or-ignore, so concurrent first reviews of a prof/course pair do not collide
+
+    Args:
+        course_review (model instance): course review
+        prof_review (model instance): prof review
+        change (int): 1 to add the ratings, -1 to remove them
+    """
+    # make sure the totals row exists, a row inserted by a concurrent request is kept as is
+    insert_stats = ProfCourseStats.__table__.insert() \
+        .prefix_with('IGNORE', dialect='mysql') \
+        .prefix_with('OR IGNORE', dialect='sqlite')
+    db.session.execute(insert_stats, {
+        'course_id': course_review.course_id, 'prof_id': prof_review.prof_id,
+        'num_ratings': 0, 'course_approved': 0, 'prof_approved': 0,
+        'difficulty_total': 0, 'usefulness_total': 0, 'workload_total': 0,
+        'clear_total': 0, 'engaging_total': 0, 'grading_total': 0
+    })
+
+    # the totals are incremented in the UPDATE statement itself, so concurrent reviews are not lost
+    ProfCourseStats.query \
+        .filter_by(course_id=course_review.course_id, prof_id=prof_review.prof_id) \
+        .update({
+            ProfCourseStats.num_ratings: ProfCourseStats.num_ratings + change,
+            ProfCourseStats.course_approved: ProfCourseStats.course_approved + change * int(bool(course_review.approval)),
+            ProfCourseStats.prof_approved: ProfCourseStats.prof_approved + change * int(bool(prof_review.approval)),
+            ProfCourseStats.difficulty_total: ProfCourseStats.difficulty_total + change * course_review.difficulty,
+            ProfCourseStats.usefulness_total: ProfCourseStats.usefulness_total + change * course_review.usefulness,
+            ProfCourseStats.workload_total: ProfCourseStats.workload_total + change * course_review.workload,
+            ProfCourseStats.clear_total: ProfCourseStats.clear_total + change * prof_review.clear,
+            ProfCourseStats.engaging_total: ProfCourseStats.engaging_total + change * prof_review.engaging,
+            ProfCourseStats.grading_total: ProfCourseStats.grading_total + change * prof_review.grading
+        }, synchronize_session=False)
+
 def update_course_stats(course, course_approval, course_difficulty, course_usefulness, course_workload, editing, prev_course_review, commit=False):
     """
     Updates a course instance's overall metrics using ratings provided from the review form
@@ -497,21 +548,32 @@ def edit_review():
     update_course_stats(course, course_approval, course_difficulty, course_usefulness, course_workload, True, course_review)
     update_prof_stats(prof, prof_approval, prof_clear, prof_engaging, prof_grading, True, prof_review)
 
+    # remove the old ratings from the prof/course totals, the new ones are added back below
+    if(review.submitted):
+        update_prof_course_stats(course_review, prof_review, -1)
+
     # update metrics in course/prof objects
     course_review.approval = course_approval
     course_review.difficulty = course_difficulty
     course_review.usefulness = course_usefulness
     course_review.workload = course_workload
     course_review.comments = course_comments
+    course_review.date_posted = review.date_posted
 
     prof_review.approval = prof_approval
     prof_review.clear = prof_clear
     prof_review.engaging = prof_engaging
     prof_review.grading = prof_grading
     prof_review.comments = prof_comments
+    prof_review.date_posted = review.date_posted
 
+    if(review.submitted):
+        update_prof_course_stats(course_review, prof_review, 1)
     db.session.commit()
 
+    # course and prof ratings changed
+    bump_ratings_version()
+
     result_review = {
         'id': review.id,
         'user_email': user_email,
@@ -551,6 +613,8 @@ def delete_review():
         db.session.delete(liked)
     for disliked in prev_prof_review.users_disliked:
         db.session.delete(disliked)
+    prev_course_review.num_liked = prev_course_review.num_disliked = 0
+    prev_prof_review.num_liked = prev_prof_review.num_disliked = 0
     db.session.commit()
 
     course = prev_course_review.course
@@ -593,12 +657,19 @@ def delete_review():
         prof.grading = (prof.grading * prof.num_ratings - prev_prof_review.grading)/(prof.num_ratings - 1)
         prof.num_ratings = prof.num_ratings - 1
 
+    # remove the ratings from the prof/course totals
+    if(review.submitted):
+        update_prof_course_stats(prev_course_review, prev_prof_review, -1)
+
     # delete all review instances
     db.session.delete(prev_course_review)
     db.session.delete(prev_prof_review)
     db.session.delete(review)
     db.session.commit()
 
+    # course and prof ratings changed
+    bump_ratings_version()
+
     return "success"
 
 @app.route('/api/review_feedback', methods=['POST'])
@@ -636,6 +707,7 @@ def review_feedback():
                 db.session.delete(review_dislike)
                 review_like = CourseReviewLiked(user_id=user.id, course_review_id=course_review.id)
                 db.session.add(review_like)
+                update_vote_counts(course_review, 1, -1)
                 db.session.commit()
             else:
                 # otherwise check if a like already exists
@@ -644,9 +716,11 @@ def review_feedback():
                 # if it exists, delete it, otherwise add it
                 if(review_like):
                     db.session.delete(review_like)
+                    update_vote_counts(course_review, -1, 0)
                 else:
                     review_like = CourseReviewLiked(user_id=user.id, course_review_id=course_review.id)
                     db.session.add(review_like)
+                    update_vote_counts(course_review, 1, 0)
                 db.session.commit()
         else:
             review_like = CourseReviewLiked.query.filter_by(user_id=user.id, course_review_id=course_review.id).first()
@@ -656,6 +730,7 @@ def review_feedback():
                 db.session.delete(review_like)
                 review_dislike = CourseReviewDisliked(user_id=user.id, course_review_id=course_review.id)
                 db.session.add(review_dislike)
+                update_vote_counts(course_review, -1, 1)
                 db.session.commit()
             else:
                 # otherwise check if a dislike already exists
@@ -664,9 +739,11 @@ def review_feedback():
                 # if it exists, delete it, otherwise add it
                 if(review_dislike):
                     db.session.delete(review_dislike)
+                    update_vote_counts(course_review, 0, -1)
                 else:
                     review_dislike = CourseReviewDisliked(user_id=user.id, course_review_id=course_review.id)
                     db.session.add(review_dislike)
+                    update_vote_counts(course_review, 0, 1)
                 db.session.commit()
     else:
         # update prof review like/dislike instance
@@ -681,6 +758,7 @@ def review_feedback():
                 db.session.delete(review_dislike)
                 review_like = ProfReviewLiked(user_id=user.id, prof_review_id=prof_review.id)
                 db.session.add(review_like)
+                update_vote_counts(prof_review, 1, -1)
                 db.session.commit()
             else:
                 # otherwise check if a like already exists
@@ -689,9 +767,11 @@ def review_feedback():
                 # if it exists, delete it, otherwise add it
                 if(review_like):
                     db.session.delete(review_like)
+                    update_vote_counts(prof_review, -1, 0)
                 else:
                     review_like = ProfReviewLiked(user_id=user.id, prof_review_id=prof_review.id)
                     db.session.add(review_like)
+                    update_vote_counts(prof_review, 1, 0)
                 db.session.commit()
         else:
             review_like = ProfReviewLiked.query.filter_by(user_id=user.id, prof_review_id=prof_review.id).first()
@@ -701,6 +781,7 @@ def review_feedback():
                 db.session.delete(review_like)
                 review_dislike = ProfReviewDisliked(user_id=user.id, prof_review_id=prof_review.id)
                 db.session.add(review_dislike)
+                update_vote_counts(prof_review, -1, 1)
                 db.session.commit()
             else:
                 # otherwise check if a dislike already exists
@@ -709,10 +790,87 @@ def review_feedback():
                 # if it exists, delete it, otherwise add it
                 if(review_dislike):
                     db.session.delete(review_dislike)
+                    update_vote_counts(prof_review, 0, -1)
                 else:
                     review_dislike = ProfReviewDisliked(user_id=user.id, prof_review_id=prof_review.id)
                     db.session.add(review_dislike)
+                    update_vote_counts(prof_review, 0, 1)
                 db.session.commit()
     
     result = jsonify({"result": 'success'})
     return result
+
+@app.route('/api/reviews', methods=['POST'])
+def reviews():
+    """
+    Get a page of the reviews of a course or prof, following the first page embedded in course_details/prof_details
+
+    Args (sent from front end):
+        courseId (int): course id, if listing the reviews of a course
+        profId (int): prof id, if listing the reviews of a prof
+        sort (string): 'newest', 'liked' or 'semester' (defaults to 'newest')
+        cursor (string): cursor returned with the previous page, None for the first page
+        limit (int): max number of reviews on the page
+        loggedIn (boolean): specifies whether the user is logged in
+        userEmail (string): email of user, if logged in
+
+    Returns:
+        result (json): the reviews of the page and the cursor of the next page, returns an error if failed
+            "reviews" (list): review objects, see course_info.get_review_info and prof_info.get_review_info
+            "cursor" (string): cursor of the next page, None if there are no more reviews
+    """
+    # get args from the front end
+    args = request.get_json()
+    course_id = args.get('courseId')
+    prof_id = args.get('profId')
+    sort = args.get('sort') or 'newest'
+    cursor = args.get('cursor')
+    logged_in = args.get('loggedIn', False)
+    user_email = args.get('userEmail')
+
+    try:
+        limit = min(max(int(args.get('limit') or REVIEW_PAGE_SIZE), 1), MAX_REVIEW_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid limit"})
+
+    # get user info if logged in
+    if(logged_in):
+        curr_user = User.query.filter_by(email=user_email).first()
+        logged_in = curr_user is not None
+    else:
+        curr_user = None
+
+    try:
+        if(course_id is not None):
+            course = Course.query.filter_by(id=course_id).first()
+            if(course is None):
+                return jsonify({"error": "No course was found"})
+            course_ids = get_topic_course_ids(course, is_parent_topic(course))
+            review_rows, next_cursor = load_course_review_page(course_ids, sort, cursor, limit)
+            review_list = get_course_review_list(review_rows, logged_in, curr_user)
+        elif(prof_id is not None):
+            review_rows, next_cursor = load_prof_review_page(prof_id, sort, cursor, limit)
+            review_list = get_prof_review_list(review_rows, logged_in, curr_user)
+        else:
+            return jsonify({"error": "No course or prof was given"})
+    except ValueError as e:
+        return jsonify({"error": str(e)})
+
+    result = jsonify({"reviews": review_list, "cursor": next_cursor})
+    return result
+
+def update_vote_counts(review, liked_change, disliked_change):
+    """
+    Update the like/dislike counts of a course/prof review.
+    The counts are incremented in the UPDATE statement itself, so concurrent votes are not lost
+
+    Args:
+        review (model instance): course review or prof review
+        liked_change (int): change in the number of likes
+        disliked_change (int): change in the number of dislikes
+    """
+    review_model = type(review)
+    if(liked_change != 0):
+        review.num_liked = review_model.num_liked + liked_change
+    if(disliked_change != 0):
+        review.num_disliked = review_model.num_disliked + disliked_change
@@ -7,11 +7,10 @@ This file contains routes to fetch information needed on the  page:
 
 import timeago, datetime
 import json
-import operator
 from flask import request, jsonify
 from utreview.models import *
 from utreview import app
-from .catalyst import course_median_grade, prof_median_grade
+from utreview.services.topic_map import get_topic_map
 from .profile_info import get_parent_id 
 
 @app.route('/api/utplus_prof', methods=['POST'])
@@ -117,8 +116,8 @@ def get_prof_info(first_name, last_name):
     if(result_prof == None):
         return None, None
 
-    # find median grade for the prof
-    median_grade = prof_median_grade(result_prof.first_name, result_prof.last_name)
+    # median grade for the prof, precomputed from the grade distributions
+    median_grade = result_prof.median_grade
 
     # get link to prof page on UT Review
     prof_link = get_prof_link(result_prof.first_name, result_prof.last_name)
@@ -167,8 +166,8 @@ def get_course_info(course_dept, course_num):
     course_dept = course.dept
     topic_num = course.topic_num
     
-    # find median grade for the course
-    median_grade = course_median_grade(course_dept.abr, course.num, topic_num, course.title)
+    # median grade for the course, precomputed from the grade distributions
+    median_grade = course.median_grade
 
     # get link to course page on UT Review
     course_link = get_course_link(course_dept.abr, course.num, topic_num)
@@ -333,16 +332,8 @@ def get_prof_review_info(review):
     user_major = user.major
     profile_pic = user.pic
 
-    num_liked = 0
-    num_disliked = 0
-
-    # calculate number of likes and determine if current user liked the review
-    for like in prof_review.users_liked:
-        num_liked += 1
-
-    # calulcate number of dislikes and determine if current user disliked the review
-    for dislike in prof_review.users_disliked:
-        num_disliked += 1
+    num_liked = prof_review.num_liked
+    num_disliked = prof_review.num_disliked
     
     # if the review comment is empty, return None
     if(prof_review.comments == ""):
@@ -428,16 +419,8 @@ def get_course_review_info(review):
     user_major = user.major
     profile_pic = user.pic
 
-    num_liked = 0
-    num_disliked = 0
-
-    # calculate number of likes and determine if current user liked the review
-    for like in course_review.users_liked:
-        num_liked += 1
-
-    # calulcate number of dislikes and determine if current user disliked the review
-    for dislike in course_review.users_disliked:
-        num_disliked += 1
+    num_liked = course_review.num_liked
+    num_disliked = course_review.num_disliked
     
     # if the review comment is empty, return None
     if(course_review.comments == ""):
@@ -492,24 +475,16 @@ def get_prof_top_review(prof):
             }
         review_list (list): list of all reviews for the prof
     """
-    # obtain list of prof reviews
-    prof_reviews = prof.reviews
-
-    # iterate through all prof reviews and add to review list
-    review_list = []
-    for prof_review in prof_reviews:
-        review = prof_review.review
-        review_object = get_prof_review_info(review)
-        if review_object:
-            review_list.append(review_object)
-    
-    if(len(review_list) == 0):
+    # find the most liked prof review with comments (fewest dislikes between ties)
+    prof_review = ProfReview.query \
+        .filter(ProfReview.prof_id == prof.id, ProfReview.comments != "") \
+        .order_by(ProfReview.num_liked.desc(), ProfReview.num_disliked, ProfReview.id) \
+        .first()
+
+    if(prof_review is None):
         return None
-    
-    review_list = sorted(review_list, key=operator.itemgetter('numDisliked'))
-    review_list = sorted(review_list, key=operator.itemgetter('numLiked'), reverse=True)
 
-    top_review = review_list[0]
+    top_review = get_prof_review_info(prof_review.review)
 
     return top_review
 
@@ -532,37 +507,20 @@ def get_course_top_review(course):
             }
         review_list (list): list of all reviews for the course
     """
-    # obtain list of course reviews
-    course_reviews_ids = []
-    course_reviews = course.reviews
-    for i in range(len(course.reviews)):
-        course_reviews_ids.append(course.reviews[i].id)
-
-    # if course is parent topic, obtain reviews from children topics
+    # obtain course ids, including children topics if course is a topic
+    course_ids = [course.id]
     if(course.topic_num != -1):
-        topic = course.topic
-        for topic_course in topic.courses:
-            topic_course_reviews = topic_course.reviews.copy()
-            for i in range(len(topic_course_reviews)):
-                if(topic_course_reviews[i].id in course_reviews_ids):
-                    continue
-                course_reviews_ids.append(topic_course_reviews[i].id)
-                course_reviews.append(topic_course_reviews[i])
-
-    # iterate through all course reviews and add to review list
-    review_list = []
-    for course_review in course_reviews:
-        review = course_review.review
-        review_object = get_course_review_info(review)
-        if review_object:
-            review_list.append(review_object)
-    
-    if(len(review_list) == 0):
+        course_ids += get_topic_map().course_ids(course.topic_id)
+
+    # find the most liked course review with comments (fewest dislikes between ties)
+    course_review = CourseReview.query \
+        .filter(CourseReview.course_id.in_(course_ids), CourseReview.comments != "") \
+        .order_by(CourseReview.num_liked.desc(), CourseReview.num_disliked, CourseReview.id) \
+        .first()
+
+    if(course_review is None):
         return None
-    
-    review_list = sorted(review_list, key=operator.itemgetter('numDisliked'))
-    review_list = sorted(review_list, key=operator.itemgetter('numLiked'), reverse=True)
 
-    top_review = review_list[0]
+    top_review = get_course_review_info(course_review.review)
 
     return top_review
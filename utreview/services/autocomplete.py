@@ -0,0 +1,129 @@
+import re
+
+from array import array
+from bisect import bisect_left
+
+from utreview.services.catalog import versioned_cache
+from utreview.services.logger import logger
+from utreview.services.ngram_index import normalize_key
+
+
+"""
+This .py file contains the in-memory sorted key arrays used to answer autocomplete prefix queries.
+"""
+
+
+def normalize_name(text):
+    """
+    Normalize a name for prefix matching (lowercase, commas removed, single spaces),
+    so "last, first" and "last first" are the same key
+    :param text: text to normalize
+    :type text: str
+    :return: normalized text
+    :rtype: str
+    """
+    return re.sub(r"[\s,]+", " ", text.lower()).strip()
+
+
+class PrefixIndex:
+    """
+    Class holding a sorted array of normalized keys and a parallel array of the ids they belong to.
+    Prefix queries binary search the first matching key and scan forward while keys still match.
+    """
+
+    def __init__(self, normalize):
+        """
+        initialize an empty index
+        :param normalize: function normalizing keys and queries
+        :type normalize: function
+        """
+        self.normalize = normalize
+        self.keys = []
+        self.ids = array('l')
+        self.labels = {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def build(self, entries):
+        """
+        Fill the index
+        :param entries: (id, label, keys) of every entry
+        :type entries: iterable[tuple(int, str, list[str])]
+        """
+        pairs = []
+        for key_id, label, keys in entries:
+            self.labels[key_id] = label
+            pairs.extend((self.normalize(key), key_id) for key in keys)
+        pairs.sort()
+
+        self.keys = [key for key, _ in pairs]
+        self.ids = array('l', (key_id for _, key_id in pairs))
+
+    def search(self, prefix, limit=10):
+        """
+        Find the entries having a key starting with the prefix
+        :param prefix: prefix typed by the user
+        :type prefix: str
+        :param limit: max number of entries
+        :type limit: int
+        :return: (id, label) of the matching entries in key order
+        :rtype: list[tuple(int, str)]
+        """
+        prefix = self.normalize(prefix)
+        if len(prefix) == 0:
+            return []
+
+        results = []
+        seen = set()
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and len(results) < limit and self.keys[i].startswith(prefix):
+            key_id = self.ids[i]
+            if key_id not in seen:
+                seen.add(key_id)
+                results.append((key_id, self.labels[key_id]))
+            i += 1
+        return results
+
+
+def build_catalog_prefixes():
+    """
+    Build prefix indexes of the course codes ("ee306") and prof names ("last first" and "first last")
+    :return: course index and prof index
+    :rtype: tuple(PrefixIndex, PrefixIndex)
+    """
+    from utreview import db
+    from utreview.models.course import Course
+    from utreview.models.others import Dept
+    from utreview.models.prof import Prof
+
+    course_rows = db.session.query(Course.id, Dept.abr, Course.num, Course.title) \
+        .join(Dept, Course.dept_id == Dept.id) \
+        .filter(Course.topic_num <= 0)
+    course_prefixes = PrefixIndex(normalize_key)
+    course_prefixes.build(
+        (course_id, f"{abr} {num} {title}", [abr + num])
+        for course_id, abr, num, title in course_rows
+    )
+
+    prof_rows = db.session.query(Prof.id, Prof.first_name, Prof.last_name)
+    prof_prefixes = PrefixIndex(normalize_name)
+    prof_prefixes.build(
+        (prof_id, f"{first_name} {last_name}", [f"{last_name} {first_name}", f"{first_name} {last_name}"])
+        for prof_id, first_name, last_name in prof_rows
+    )
+
+    logger.info(f"Built autocomplete indexes: {len(course_prefixes)} courses, {len(prof_prefixes)} profs")
+    return course_prefixes, prof_prefixes
+
+
+__catalog_prefixes = versioned_cache(build_catalog_prefixes)
+
+
+def get_catalog_prefixes():
+    """
+    Get the autocomplete indexes, rebuilding them if the catalog changed since they were built
+    :return: course index and prof index
+    :rtype: tuple(PrefixIndex, PrefixIndex)
+    """
+    return __catalog_prefixes()
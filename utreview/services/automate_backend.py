@@ -1,5 +1,6 @@
 
 import datetime
+import json
 import os
 import pytz
 import re
@@ -9,7 +10,7 @@ import time
 from .fetch_course_info import fetch_courses, fetch_dept_info
 from .fetch_ftp import fetch_ftp_files, fetch_sem_values, parse_ftp
 from .fetch_web import fetch_depts
-from utreview import sem_current, update_sem_vals
+from utreview import update_sem_vals
 from utreview.database.populate_database import (
     populate_course,
     populate_dept,
@@ -18,12 +19,26 @@ from utreview.database.populate_database import (
     populate_prof_course,
     populate_prof_eid,
     populate_scheduled_course,
+    refresh_prof_course_ecis,
+    refresh_median_grades,
+    refresh_prof_course_stats,
+    refresh_review_dates,
+    refresh_review_votes,
     reset_scheduled_info
 )
+from utreview.services.catalog import catalog_version
+from utreview.services.semester import current_semesters
 from utreview.services.fetch_prof import parse_prof_csv
+from utreview.services.grade_store import GRADE_STORE, ensure_grade_store, grade_store_version, ingest_grades
+from utreview.services.search_index import rebuild_search_ixs
 from utreview.services.logger import DEFAULT_LOG_FOLDER, logger
 
 
+# file next to the grade store holding the versions of the grade store and of the catalog (topic titles)
+# the median grades were last computed from, so a restart does not recompute them
+MEDIAN_GRADES_VERSION = f"{GRADE_STORE}.medians"
+
+
 def automate_backend(run_once):
     """
     Function used to automate backend tasks such as
@@ -57,8 +72,8 @@ def automate_backend(run_once):
         # task 1: fetch ftp files and update scheduled course info
         logger.info("Fetching new ftp files")
         fetch_ftp_files('input_data')
-        semester_path = fetch_sem_values("input_data", "input_data")
-        update_sem_vals(semester_path)
+        fetch_sem_values("input_data", "input_data")
+        update_sem_vals()
 
         # logger.info("Updating scheduled course database info")
         ftp_info = parse_ftp("input_data")
@@ -68,6 +83,9 @@ def automate_backend(run_once):
         # task 2: read maintenance.txt and perform task as necessary
         run_maintenance()
 
+        # refresh the median grades if grades.db changed
+        refresh_median_grades_on_change()
+
         # task 3: organize log files
         organize_log_files()
         logger.info("Finished automation")
@@ -85,6 +103,20 @@ def run_maintenance():
             update ProfCourse  relationships (should receive most of NEW info from FTP)
         4. ‘prof <insert path to file>'
             update Professor info (unlikely)
+        5. ‘search_ix <course, prof or all>'
+            rebuild the search indexes from scratch (new semester, schema change)
+        6. ‘review_votes'
+            reconcile review like/dislike counts with the like/dislike rows
+        7. ‘prof_course_stats'
+            rebuild the prof/course rating totals from the submitted reviews
+        8. ‘prof_course_ecis'
+            recompute the prof/course ecis averages from the ecis scores
+        9. ‘review_dates'
+            copy the review dates onto the course/prof reviews (used to page reviews by date), then make them NOT NULL
+        10. ‘grades <insert path to grades.db>'
+            rebuild the grade distribution store and the median grades (also rebuilt automatically when grades.db changes)
+        11. ‘median_grades'
+            recompute the course and prof median grades from the grade distribution store
     """
     __maintenance_txt_file = "maintenance.txt"
     logger.info(f"Initiating {__maintenance_txt_file}")
@@ -115,17 +147,87 @@ def run_maintenance():
                     elif cmd == 'prof':
                         profs = parse_prof_csv(path)
                         populate_prof_eid(profs)
+                    elif cmd == 'search_ix':
+                        rebuild_search_ixs(path)
+                    elif cmd == 'grades':
+                        ingest_grades(path)
+                        refresh_median_grades_on_change()
                     elif cmd == 'ftp':
                         logger.info("Updating scheduled course database info")
                         ftp_info = parse_ftp("input_data")
                         reset_scheduled_info()
                         populate_scheduled_course(ftp_info)
-            
+            elif command.strip() == 'review_votes':
+                logger.info("Executing review_votes")
+                refresh_review_votes()
+            elif command.strip() == 'prof_course_stats':
+                logger.info("Executing prof_course_stats")
+                refresh_prof_course_stats()
+            elif command.strip() == 'prof_course_ecis':
+                logger.info("Executing prof_course_ecis")
+                refresh_prof_course_ecis()
+            elif command.strip() == 'review_dates':
+                logger.info("Executing review_dates")
+                refresh_review_dates()
+            elif command.strip() == 'median_grades':
+                logger.info("Executing median_grades")
+                refresh_median_grades()
+                write_median_grades_version(median_grades_version())
+
             commands = commands[1:]
             with open(__maintenance_txt_file, 'w') as f:
                 f.writelines(commands)
 
 
+def refresh_median_grades_on_change():
+    """
+    Recompute the course and prof median grades if the grade store was rebuilt or the catalog changed
+    (new topic courses) since they were last computed.
+    The grade store is rebuilt first if grades.db changed
+    """
+    if not ensure_grade_store():
+        return
+
+    version = median_grades_version()
+    if version != read_median_grades_version():
+        refresh_median_grades()
+        write_median_grades_version(version)
+
+
+def median_grades_version():
+    """
+    Get the version of the data the median grades are computed from
+    :return: grade store version and catalog version
+    :rtype: list[int]
+    """
+    return [grade_store_version(), catalog_version()]
+
+
+def read_median_grades_version():
+    """
+    Get the version of the data the median grades were last computed from
+    :return: grade store version and catalog version, None if the median grades were never computed
+    :rtype: list[int] or None
+    """
+    try:
+        with open(MEDIAN_GRADES_VERSION, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_median_grades_version(version):
+    """
+    Replace the version of the data the median grades were last computed from
+    :param version: grade store version and catalog version
+    :type version: list[int]
+    """
+    tmp_path = f"{MEDIAN_GRADES_VERSION}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(version, f)
+    os.replace(tmp_path, MEDIAN_GRADES_VERSION)
+
+
 def maintenance_course_task(path, pages):
     """
     Run maintenance task for course request
@@ -147,6 +249,7 @@ def maintenance_course_task(path, pages):
 
     logger.info("Updating course info")
     courses = fetch_courses(path, pages)
+    sem_current = current_semesters()[0]
     populate_course(courses, cur_sem=int(sem_current))
 
 
@@ -0,0 +1,190 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from utreview.services.logger import logger
+
+
+"""
+This .py file contains functions for tracking the versions of the course/prof catalog and of their ratings.
+The catalog version changes with course, prof and topic names (search indexes, topic map, search result cache),
+the ratings version changes with the ratings, ecis averages and semesters of courses/profs (catalog snapshot).
+The versions are stored in files so every worker sees the changes made by the backend pipeline or other workers.
+"""
+
+
+CATALOG_VERSION_FILE = "input_data/catalog_version.txt"
+RATINGS_VERSION_FILE = "input_data/ratings_version.txt"
+
+__version_cache = {
+    CATALOG_VERSION_FILE: {'stat': None, 'version': 0},
+    RATINGS_VERSION_FILE: {'stat': None, 'version': 0}
+}
+
+
+def read_version(path):
+    """
+    Get the version stored in a version file. The file is only read again when it is replaced.
+    :param path: path to the version file
+    :type path: str
+    :return: version (0 if the file does not exist)
+    :rtype: int
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 0
+
+    # bump_version replaces the file, so the inode changes on every bump
+    cache = __version_cache[path]
+    stat_key = (stat.st_ino, stat.st_mtime_ns)
+    if cache['stat'] != stat_key:
+        with open(path, 'r') as f:
+            version = f.read().strip()
+        cache['version'] = int(version) if version.isdigit() else 0
+        cache['stat'] = stat_key
+
+    return cache['version']
+
+
+def bump_version(path):
+    """
+    Replace the version stored in a version file with a newer one
+    :param path: path to the version file
+    :type path: str
+    :return: new version
+    :rtype: int
+    """
+    version = max(time.time_ns(), read_version(path) + 1)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp_path, 'w') as f:
+        f.write(str(version))
+    os.replace(tmp_path, path)
+
+    logger.debug(f"Version {path} bumped to {version}")
+    return version
+
+
+def catalog_version():
+    """
+    Get the current catalog version
+    :return: catalog version (0 if the catalog was never versioned)
+    :rtype: int
+    """
+    return read_version(CATALOG_VERSION_FILE)
+
+
+def bump_catalog_version():
+    """
+    Mark the catalog (course, prof or topic names) as changed so cached catalog data is rebuilt
+    :return: new catalog version
+    :rtype: int
+    """
+    return bump_version(CATALOG_VERSION_FILE)
+
+
+def ratings_version():
+    """
+    Get the current ratings version
+    :return: ratings version (0 if the ratings were never versioned)
+    :rtype: int
+    """
+    return read_version(RATINGS_VERSION_FILE)
+
+
+def bump_ratings_version():
+    """
+    Mark the course/prof ratings, ecis averages or semesters as changed so the data built from them is rebuilt.
+    Unlike bump_catalog_version, the search indexes and the search result cache are kept
+    :return: new ratings version
+    :rtype: int
+    """
+    return bump_version(RATINGS_VERSION_FILE)
+
+
+def versioned_cache(build, version=catalog_version):
+    """
+    Cache the result of a build function once per version, shared by every thread of the worker.
+    The result is rebuilt the first time it is requested after the version changes
+    :param build: function building the cached value from the database
+    :type build: function
+    :param version: function returning the current version of the data the value is built from
+    :type version: function
+    :return: function returning the cached value
+    :rtype: function
+    """
+    lock = threading.Lock()
+
+    # version and value are swapped in together so readers never see a mismatched pair
+    cache = {'entry': (None, None)}
+
+    def get():
+        current = version()
+        if cache['entry'][0] != current:
+            with lock:
+                if cache['entry'][0] != current:
+                    cache['entry'] = (current, build())
+        return cache['entry'][1]
+
+    return get
+
+
+def snapshot_version():
+    """
+    Get the version of the data built from both the catalog and the ratings
+    :return: catalog version and ratings version
+    :rtype: tuple(int, int)
+    """
+    return catalog_version(), ratings_version()
+
+
+class CatalogSnapshot:
+    """
+    Class holding a pre-serialized, gzip-compressed JSON payload built from the catalog and its ratings.
+    The payload is rebuilt the first time it is requested after the catalog or ratings version changes.
+    """
+
+    def __init__(self, build):
+        """
+        initialize an empty snapshot
+        :param build: function returning the JSON serializable payload
+        :type build: function
+        """
+        self.build = build
+        self.version = None
+        self.payload = (None, None)
+        self.__lock = threading.Lock()
+
+    def get(self):
+        """
+        Get the snapshot, rebuilding it if the catalog or the ratings changed
+        :return: etag of the payload and the gzip-compressed payload
+        :rtype: tuple(str, bytes)
+        """
+        version = snapshot_version()
+        if self.version != version:
+            with self.__lock:
+                if self.version != version:
+                    self.refresh(version)
+        return self.payload
+
+    def refresh(self, version):
+        """
+        Build and serialize the payload for the given version
+        :param version: catalog and ratings version the payload is built for
+        :type version: tuple(int, int)
+        """
+        start = time.time()
+        raw = json.dumps(self.build(), separators=(',', ':')).encode('utf-8')
+
+        # etag and body are swapped in together so readers never see a mismatched pair
+        etag = hashlib.sha1(raw).hexdigest()
+        self.payload = (etag, gzip.compress(raw))
+        self.version = version
+
+        logger.info(f"Built catalog snapshot {etag}: {len(raw)} bytes, {len(self.payload[1])} gzipped, "
+                    f"{time.time() - start:.2f}s")
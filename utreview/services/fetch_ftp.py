@@ -3,7 +3,7 @@ import json
 import re
 
 from ftplib import FTP
-from os import chdir, getcwd
+from os import chdir, getcwd, getpid, replace
 from os.path import join, isfile
 
 from utreview.services.logger import logger
@@ -59,8 +59,11 @@ def fetch_sem_values(ftp_dir, out_dir):
 
 		sem_dict[keys[i]] = sem
 
-	with open(out_path, 'w') as f:
+	# replace the file atomically so workers reloading it never read a partial file
+	tmp_path = f"{out_path}.{getpid()}.tmp"
+	with open(tmp_path, 'w') as f:
 		json.dump(sem_dict, f)
+	replace(tmp_path, out_path)
 	
 	return out_path
 
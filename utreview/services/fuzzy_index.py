@@ -0,0 +1,206 @@
+import re
+
+from collections import defaultdict
+
+from utreview.services.catalog import versioned_cache
+from utreview.services.logger import logger
+from utreview.services.search_index import course_content, prof_content
+
+
+"""
+This .py file contains an in-memory symmetric delete index used to match misspelled course titles and prof names.
+"""
+
+
+def tokenize(text):
+    """
+    Split text into lowercase alphabetic terms
+    :param text: text to split
+    :type text: str
+    :return: terms of the text
+    :rtype: list[str]
+    """
+    return re.findall(r"[a-z]+", text.lower())
+
+
+def max_edit_distance(term):
+    """
+    Get the edit distance allowed for a term. Short terms are too ambiguous to correct
+    :param term: term to correct
+    :type term: str
+    :return: max edit distance
+    :rtype: int
+    """
+    if len(term) >= 8:
+        return 2
+    if len(term) >= 5:
+        return 1
+    return 0
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Damerau-Levenshtein (optimal string alignment) distance between two terms
+    :param a: first term
+    :type a: str
+    :param b: second term
+    :type b: str
+    :param max_distance: distance above which the exact value does not matter
+    :type max_distance: int
+    :return: edit distance, or max_distance + 1 if it is larger than max_distance
+    :rtype: int
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev_prev[j - 2] + 1)
+
+        # every alignment already costs too much
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, cur
+
+    return prev[-1] if prev[-1] <= max_distance else max_distance + 1
+
+
+class FuzzyIndex:
+    """
+    Class implementing a symmetric delete dictionary. Every term is stored under the strings obtained by deleting
+    up to max_distance characters from its prefix, so a lookup only generates the deletes of the query term
+    instead of comparing it to the whole vocabulary.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=7):
+        """
+        initialize an empty index
+        :param max_distance: largest edit distance supported
+        :type max_distance: int
+        :param prefix_length: number of leading characters used to generate deletes
+        :type prefix_length: int
+        """
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.terms = defaultdict(set)
+        self.deletes = defaultdict(set)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __generate_deletes(self, term, max_distance):
+        """
+        Generate the strings obtained by deleting up to max_distance characters from the prefix of the term
+        :param term: term to generate the deletes of
+        :type term: str
+        :param max_distance: max number of deletes
+        :type max_distance: int
+        :return: the prefix and its deletes
+        :rtype: set[str]
+        """
+        prefix = term[:self.prefix_length]
+        deletes = {prefix}
+        edits = {prefix}
+        for _ in range(max_distance):
+            edits = {edit[:i] + edit[i + 1:] for edit in edits for i in range(len(edit))}
+            deletes |= edits
+        return deletes
+
+    def add(self, key_id, text):
+        """
+        Add the terms of a text to the index
+        :param key_id: id the text belongs to
+        :type key_id: int
+        :param text: text to index
+        :type text: str
+        """
+        for term in tokenize(text):
+            if term not in self.terms:
+                for delete in self.__generate_deletes(term, self.max_distance):
+                    self.deletes[delete].add(term)
+            self.terms[term].add(key_id)
+
+    def lookup(self, term):
+        """
+        Find the indexed terms within the allowed edit distance of a term
+        :param term: term to look up
+        :type term: str
+        :return: mapping from matching term to its distance
+        :rtype: dict[str, int]
+        """
+        max_distance = min(max_edit_distance(term), self.max_distance)
+        if max_distance == 0:
+            return {term: 0} if term in self.terms else {}
+
+        matches = {}
+        for delete in self.__generate_deletes(term, max_distance):
+            for candidate in self.deletes.get(delete, ()):
+                if candidate in matches:
+                    continue
+                distance = edit_distance(term, candidate, max_distance)
+                if distance <= max_distance:
+                    matches[candidate] = distance
+        return matches
+
+    def search(self, text, limit=50):
+        """
+        Find the ids whose text has terms close to the terms of the query.
+        Ids matching more query terms with fewer edits come first
+        :param text: query text
+        :type text: str
+        :param limit: max number of ids
+        :type limit: int
+        :return: matching ids
+        :rtype: list[int]
+        """
+        scores = defaultdict(int)
+        for term in tokenize(text):
+            term_scores = {}
+            for match, distance in self.lookup(term).items():
+                for key_id in self.terms[match]:
+                    term_scores[key_id] = max(term_scores.get(key_id, 0), self.max_distance + 1 - distance)
+            for key_id, score in term_scores.items():
+                scores[key_id] += score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [key_id for key_id, _ in ranked[:limit]]
+
+
+def build_catalog_fuzzy():
+    """
+    Build fuzzy indexes over the same course and prof content as the search indexes
+    :return: course index and prof index
+    :rtype: tuple(FuzzyIndex, FuzzyIndex)
+    """
+    from sqlalchemy.orm import joinedload
+    from utreview.models.course import Course
+    from utreview.models.prof import Prof
+
+    course_fuzzy = FuzzyIndex()
+    for course in Course.query.options(joinedload(Course.dept)):
+        course_fuzzy.add(course.id, course_content(course))
+
+    prof_fuzzy = FuzzyIndex()
+    for prof in Prof.query.all():
+        prof_fuzzy.add(prof.id, prof_content(prof))
+
+    logger.info(f"Built fuzzy search indexes: {len(course_fuzzy)} course terms, {len(prof_fuzzy)} prof terms")
+    return course_fuzzy, prof_fuzzy
+
+
+__catalog_fuzzy = versioned_cache(build_catalog_fuzzy)
+
+
+def get_catalog_fuzzy():
+    """
+    Get the catalog fuzzy indexes, rebuilding them if the catalog changed since they were built
+    :return: course index and prof index
+    :rtype: tuple(FuzzyIndex, FuzzyIndex)
+    """
+    return __catalog_fuzzy()
@@ -0,0 +1,586 @@
+import numpy as np
+import os
+import re
+import sqlite3
+import threading
+
+from utreview.services.logger import logger
+
+
+"""
+This .py file contains the grade distribution store built from the UT Catalyst grades.db.
+The aggregate rows of grades.db are normalized once at ingest into keyed, indexed rows,
+and the store is loaded into an in-memory columnar cache (numpy histograms with hash indexes on the keys)
+so the course/prof pages look grades up without any query.
+Median grades are computed for every course and prof at once from the histograms of the cache.
+"""
+
+
+GRADES_DB = "grades.db"
+GRADE_STORE = os.path.join("input_data", "grade_store.db")
+
+# format of the grade store (its user_version), stores of another format are rebuilt from grades.db
+GRADE_STORE_FORMAT = 2
+
+GRADE_KEYS = ['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D+', 'D', 'D-', 'F']
+GRADE_COLUMNS = ['a', 'a_minus', 'b_plus', 'b', 'b_minus', 'c_plus', 'c', 'c_minus', 'd_plus', 'd', 'd_minus', 'f']
+
+# position of the first grade count (A) in the agg table, the twelve counts follow in GRADE_KEYS order
+AGG_FIRST_GRADE = 6
+
+# bytes of the grade store memory mapped by each connection and number of prepared statements kept per connection
+MMAP_SIZE = 64 * 1024 * 1024
+CACHED_STATEMENTS = 32
+
+# key columns of the grade store and the key column combinations the cache is indexed on
+KEY_COLUMNS = ['dept', 'course_nbr', 'course_name', 'prof_key']
+INDEX_COLUMNS = [
+    ('dept', 'course_nbr'),
+    ('dept', 'course_nbr', 'course_name'),
+    ('prof_key',),
+    ('dept', 'course_nbr', 'prof_key')
+]
+
+__lock = threading.Lock()
+
+# read-only connection to the grade store of each thread, with the file it was opened on
+__local = threading.local()
+
+__grade_cache = {
+    'stat': None,
+    'cache': None
+}
+
+
+def normalize_dept(dept):
+    """
+    Normalize a dept abbreviation (ex: 'c s' -> 'CS')
+    :param dept: dept abbreviation
+    :type dept: str
+    :return: normalized dept
+    :rtype: str
+    """
+    return re.sub(r"\s+", "", dept or "").upper()
+
+
+def normalize_course_nbr(course_nbr):
+    """
+    Normalize a course number (ex: ' 312h' -> '312H')
+    :param course_nbr: course number
+    :type course_nbr: str
+    :return: normalized course number
+    :rtype: str
+    """
+    return (course_nbr or "").strip().upper()
+
+
+def normalize_title(title):
+    """
+    Normalize a course title for matching (uppercase, single spaces)
+    :param title: course title
+    :type title: str
+    :return: normalized title
+    :rtype: str
+    """
+    return re.sub(r"\s+", " ", title or "").strip().upper()
+
+
+def prof_key(prof_first, prof_last):
+    """
+    Get the key of a prof: the last word of the last name and the whole first name (ex: 'BERG, JOHN PAUL').
+    The whole first name is kept so that profs sharing a last name and a first word do not share grades
+    :param prof_first: prof first name
+    :type prof_first: str
+    :param prof_last: prof last name
+    :type prof_last: str
+    :return: prof key, None if a name is missing
+    :rtype: str or None
+    """
+    first = (prof_first or "").replace('\'', '').split()
+    last = (prof_last or "").replace('\'', ' ').split()
+    if len(first) == 0 or len(last) == 0:
+        return None
+    return f"{last[-1]}, {' '.join(first)}".upper()
+
+
+def agg_prof_key(agg_prof):
+    """
+    Get the key of a prof listed in grades.db as 'LAST, FIRST MIDDLE'
+    :param agg_prof: prof name from grades.db
+    :type agg_prof: str
+    :return: prof key, None if the name cannot be parsed
+    :rtype: str or None
+    """
+    name_parts = (agg_prof or "").split(',', 1)
+    if len(name_parts) != 2:
+        return None
+    return prof_key(name_parts[1], name_parts[0])
+
+
+def load_topic_titles():
+    """
+    Get the titles of the topic courses, used to match grades.db course names to topics
+    :return: mapping from (normalized dept, normalized course number) to the normalized topic titles
+    :rtype: dict[tuple(str, str), list[str]]
+    """
+    from utreview import db
+    from utreview.models.course import Course
+    from utreview.models.others import Dept
+
+    rows = db.session.query(Dept.abr, Course.num, Course.title) \
+        .join(Dept, Course.dept_id == Dept.id) \
+        .filter(Course.topic_num > 0)
+
+    topic_titles = {}
+    for abr, num, title in rows:
+        title = normalize_title(title)
+        if len(title) > 0:
+            topic_titles.setdefault((normalize_dept(abr), normalize_course_nbr(num)), []).append(title)
+
+    # longest titles first so the most specific topic wins
+    for titles in topic_titles.values():
+        titles.sort(key=len, reverse=True)
+    return topic_titles
+
+
+def match_topic_title(course_name, titles):
+    """
+    Find the topic a grades.db course name belongs to
+    :param course_name: normalized course name from grades.db
+    :type course_name: str
+    :param titles: normalized topic titles of the course, longest first
+    :type titles: list[str]
+    :return: matched topic title, '' if none match
+    :rtype: str
+    """
+    for title in titles:
+        if title in course_name:
+            return title
+    return ""
+
+
+def ingest_grades(src=GRADES_DB, dst=GRADE_STORE):
+    """
+    Normalize the aggregate rows of grades.db into the grade store.
+    The store is written to a temporary file and swapped in atomically
+    :param src: path to grades.db
+    :type src: str
+    :param dst: path to the grade store
+    :type dst: str
+    :return: number of keyed rows in the grade store
+    :rtype: int
+    """
+    logger.info(f"Ingesting grade distributions from {src}")
+
+    # sum the aggregate rows of every key
+    totals = {}
+    src_conn = sqlite3.connect(f"file:{src}?mode=ro", uri=True)
+    try:
+        cur = src_conn.execute("SELECT * FROM agg WHERE sem LIKE '%Aggregate%'")
+        columns = {description[0].lower(): i for i, description in enumerate(cur.description)}
+        for row in cur:
+            key_prof = agg_prof_key(row[columns['prof']])
+            if key_prof is None:
+                continue
+
+            dept = normalize_dept(row[columns['dept']])
+            course_nbr = normalize_course_nbr(row[columns['course_nbr']])
+            course_name = normalize_title(row[columns['course_name']])
+
+            key = (dept, course_nbr, course_name, key_prof)
+            counts = totals.setdefault(key, [0] * len(GRADE_KEYS))
+            for i in range(len(GRADE_KEYS)):
+                counts[i] += row[AGG_FIRST_GRADE + i] or 0
+    finally:
+        src_conn.close()
+
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(f"""
+            CREATE TABLE grades (
+                dept TEXT NOT NULL,
+                course_nbr TEXT NOT NULL,
+                course_name TEXT NOT NULL,
+                prof_key TEXT NOT NULL,
+                {', '.join(f'{column} INTEGER NOT NULL' for column in GRADE_COLUMNS)}
+            )
+        """)
+        conn.executemany(
+            f"INSERT INTO grades VALUES ({', '.join(['?'] * (4 + len(GRADE_COLUMNS)))})",
+            (key + tuple(counts) for key, counts in totals.items())
+        )
+        conn.execute("CREATE INDEX ix_grades_course ON grades (dept, course_nbr)")
+        conn.execute("CREATE INDEX ix_grades_course_prof ON grades (dept, course_nbr, prof_key)")
+        conn.execute("CREATE INDEX ix_grades_prof ON grades (prof_key)")
+        conn.execute(f"PRAGMA user_version = {GRADE_STORE_FORMAT}")
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, dst)
+    logger.info(f"Built grade store {dst}: {len(totals)} rows")
+    return len(totals)
+
+
+def grade_store_is_current(src_mtime):
+    """
+    Check whether the grade store exists, is not older than grades.db and has the current format
+    :param src_mtime: modification time of grades.db
+    :type src_mtime: int
+    :return: whether the grade store is current
+    :rtype: bool
+    """
+    try:
+        if os.stat(GRADE_STORE).st_mtime_ns < src_mtime:
+            return False
+    except FileNotFoundError:
+        return False
+
+    conn = sqlite3.connect(f"file:{GRADE_STORE}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0] == GRADE_STORE_FORMAT
+    finally:
+        conn.close()
+
+
+def ensure_grade_store():
+    """
+    Ingest grades.db if the grade store is missing, older than grades.db or of another format
+    :return: whether the grade store is available
+    :rtype: bool
+    """
+    try:
+        src_mtime = os.stat(GRADES_DB).st_mtime_ns
+    except FileNotFoundError:
+        if os.path.exists(GRADE_STORE):
+            return True
+        logger.warning(f"Cannot find {GRADES_DB}. No grade distributions available")
+        return False
+
+    if grade_store_is_current(src_mtime):
+        return True
+
+    with __lock:
+        # another thread may have ingested while waiting for the lock
+        if grade_store_is_current(src_mtime):
+            return True
+
+        try:
+            ingest_grades()
+        except sqlite3.Error as e:
+            logger.error(f"Cannot ingest {GRADES_DB}: {e}")
+            return os.path.exists(GRADE_STORE)
+
+    return True
+
+
+def get_connection():
+    """
+    Get the read-only connection to the grade store of the current thread.
+    The store is never modified in place (ingest_grades replaces the file), so the connection is opened as immutable
+    and only reopened when the file is replaced
+    :return: connection to the grade store, None if the grade store is not available
+    :rtype: sqlite3.Connection or None
+    """
+    if not ensure_grade_store():
+        return None
+
+    try:
+        stat = os.stat(GRADE_STORE)
+    except FileNotFoundError:
+        return None
+
+    stat_key = (stat.st_ino, stat.st_mtime_ns)
+    conn = getattr(__local, 'conn', None)
+    if conn is None or __local.stat != stat_key:
+        if conn is not None:
+            conn.close()
+
+        conn = sqlite3.connect(f"file:{GRADE_STORE}?mode=ro&immutable=1", uri=True,
+                               cached_statements=CACHED_STATEMENTS)
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        __local.conn = conn
+        __local.stat = stat_key
+
+    return conn
+
+
+class GradeIndex:
+    """
+    Class holding the grade histograms of a grade cache summed by a combination of key columns.
+    The histograms of every key are summed once at load, so a lookup is a hash lookup and a row read
+    """
+
+    def __init__(self, key_codes, histograms):
+        """
+        sum the histograms of every distinct key
+        :param key_codes: dictionary codes of each key column, one array per column
+        :type key_codes: list[numpy.ndarray]
+        :param histograms: one row of twelve counts in GRADE_KEYS order per grade cache row
+        :type histograms: numpy.ndarray
+        """
+        codes = np.stack(key_codes, axis=1)
+        if len(codes) > 0:
+            keys, group_ids = np.unique(codes, axis=0, return_inverse=True)
+        else:
+            keys, group_ids = codes, np.zeros(0, dtype=np.intp)
+
+        self.keys = keys
+        self.sums = np.zeros((len(keys), len(GRADE_KEYS)), dtype=np.int64)
+        np.add.at(self.sums, group_ids.reshape(-1), histograms)
+        self.groups = {tuple(key): group for group, key in enumerate(keys.tolist())}
+
+    def get(self, key_codes):
+        """
+        Get the summed histogram of a key
+        :param key_codes: dictionary codes of the key
+        :type key_codes: tuple(int)
+        :return: summed histogram, None if the key has no rows
+        :rtype: numpy.ndarray or None
+        """
+        group = self.groups.get(key_codes)
+        return self.sums[group] if group is not None else None
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class GradeCache:
+    """
+    Class holding the grade store in memory as columns: an int32 (rows x 12) histogram matrix and
+    dictionary-encoded key columns, with a GradeIndex per key column combination in INDEX_COLUMNS.
+    A cache is never modified once built, a new cache is built when the grade store changes
+    """
+
+    def __init__(self):
+        """
+        initialize an empty cache
+        """
+        self.histograms = np.zeros((0, len(GRADE_KEYS)), dtype=np.int32)
+        self.vocab = {column: {} for column in KEY_COLUMNS}
+        self.values = {column: [] for column in KEY_COLUMNS}
+        self.indexes = {}
+
+    def build(self, rows):
+        """
+        Build the cache from the grade store rows
+        :param rows: key columns in KEY_COLUMNS order followed by the twelve counts in GRADE_KEYS order
+        :type rows: list[tuple]
+        """
+        num_keys = len(KEY_COLUMNS)
+        self.histograms = np.array([row[num_keys:] for row in rows], dtype=np.int32) \
+            .reshape(len(rows), len(GRADE_KEYS))
+
+        codes = {}
+        for i, column in enumerate(KEY_COLUMNS):
+            vocab = self.vocab[column]
+            codes[column] = np.fromiter((vocab.setdefault(row[i], len(vocab)) for row in rows),
+                                        dtype=np.int32, count=len(rows))
+            self.values[column] = list(vocab)
+
+        self.indexes = {
+            columns: GradeIndex([codes[column] for column in columns], self.histograms)
+            for columns in INDEX_COLUMNS
+        }
+
+    def encode(self, columns, key):
+        """
+        Get the dictionary codes of a key
+        :param columns: key columns
+        :type columns: tuple(str)
+        :param key: normalized value of each key column
+        :type key: tuple(str)
+        :return: codes of the key, None if a value never appears in the grade store
+        :rtype: tuple(int) or None
+        """
+        key_codes = tuple(self.vocab[column].get(value) for column, value in zip(columns, key))
+        return None if None in key_codes else key_codes
+
+    def lookup(self, columns, key):
+        """
+        Get the grade distribution of a key
+        :param columns: key columns, one of INDEX_COLUMNS
+        :type columns: tuple(str)
+        :param key: normalized value of each key column
+        :type key: tuple(str)
+        :return: number of people obtaining each grade, None if there is no distribution
+        :rtype: dict[str, int] or None
+        """
+        key_codes = self.encode(columns, key)
+        histogram = self.indexes[columns].get(key_codes) if key_codes is not None else None
+        if histogram is None:
+            return None
+        return dict(zip(GRADE_KEYS, histogram.tolist()))
+
+    def group_histograms(self, columns):
+        """
+        Get the summed histogram of every key of a key column combination
+        :param columns: key columns, one of INDEX_COLUMNS
+        :type columns: tuple(str)
+        :return: decoded keys and the matching summed histograms
+        :rtype: tuple(list[tuple], numpy.ndarray)
+        """
+        index = self.indexes[columns]
+        values = [self.values[column] for column in columns]
+        keys = [tuple(values[i][code] for i, code in enumerate(key)) for key in index.keys.tolist()]
+        return keys, index.sums
+
+    def __len__(self):
+        return len(self.histograms)
+
+
+def build_grade_cache():
+    """
+    Load the grade store into a new grade cache
+    :return: grade cache, empty if the grade store is not available
+    :rtype: GradeCache
+    """
+    grade_cache = GradeCache()
+    conn = get_connection()
+    if conn is None:
+        grade_cache.build([])
+        return grade_cache
+
+    rows = conn.execute(f"SELECT {', '.join(KEY_COLUMNS + GRADE_COLUMNS)} FROM grades").fetchall()
+    grade_cache.build(rows)
+
+    logger.info(f"Built grade cache: {len(grade_cache)} rows, "
+                f"{', '.join(f'{len(index)} {columns}' for columns, index in grade_cache.indexes.items())}")
+    return grade_cache
+
+
+def get_grade_cache():
+    """
+    Get the grade cache, rebuilding it if the grade store changed since it was built.
+    The new cache is swapped in with a single assignment, so readers see either the old or the new cache
+    :return: grade cache
+    :rtype: GradeCache
+    """
+    ensure_grade_store()
+    try:
+        stat = os.stat(GRADE_STORE)
+        stat_key = (stat.st_ino, stat.st_mtime_ns)
+    except FileNotFoundError:
+        stat_key = None
+
+    if __grade_cache['cache'] is None or __grade_cache['stat'] != stat_key:
+        with __lock:
+            if __grade_cache['cache'] is None or __grade_cache['stat'] != stat_key:
+                __grade_cache['cache'] = build_grade_cache()
+                __grade_cache['stat'] = stat_key
+
+    return __grade_cache['cache']
+
+
+def course_prof_grades(course_dept, course_num, prof_first, prof_last):
+    """
+    Get the grade distribution of a course taught by a prof
+    :param course_dept: course dept abbreviation
+    :type course_dept: str
+    :param course_num: course number
+    :type course_num: str
+    :param prof_first: prof first name
+    :type prof_first: str
+    :param prof_last: prof last name
+    :type prof_last: str
+    :return: number of people obtaining each grade, None if there is no distribution
+    :rtype: dict[str, int] or None
+    """
+    return course_prof_grades_batch([(course_dept, course_num, prof_first, prof_last)])[0]
+
+
+def course_prof_grades_batch(lookups):
+    """
+    Get the grade distributions of several courses taught by profs from the grade cache
+    :param lookups: course dept abbreviation, course number, prof first name and prof last name of each lookup
+    :type lookups: list[tuple(str, str, str, str)]
+    :return: number of people obtaining each grade for each lookup (same order), None where there is no distribution
+    :rtype: list[dict[str, int] or None]
+    """
+    grade_cache = get_grade_cache()
+    grades = []
+    for course_dept, course_num, prof_first, prof_last in lookups:
+        key_prof = prof_key(prof_first, prof_last)
+        if key_prof is None:
+            grades.append(None)
+            continue
+        key = (normalize_dept(course_dept), normalize_course_nbr(course_num), key_prof)
+        grades.append(grade_cache.lookup(('dept', 'course_nbr', 'prof_key'), key))
+
+    return grades
+
+
+def grade_store_version():
+    """
+    Get the version of the grade store, changing every time it is rebuilt
+    :return: modification time of the grade store, None if it does not exist
+    :rtype: int or None
+    """
+    try:
+        return os.stat(GRADE_STORE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def load_histograms(key_columns):
+    """
+    Get the grade histograms of the grade cache summed by the given key columns
+    :param key_columns: key columns to group by, one of INDEX_COLUMNS (ex: ['prof_key'])
+    :type key_columns: list[str]
+    :return: keys and the matching histograms (one row of twelve counts in GRADE_KEYS order per key)
+    :rtype: tuple(list[tuple], numpy.ndarray)
+    """
+    return get_grade_cache().group_histograms(tuple(key_columns))
+
+
+def load_topic_histograms():
+    """
+    Get the grade histograms of the grade cache summed by topic.
+    Course names are matched to the topic titles of the current catalog, so topics added after grades.db was ingested
+    are matched too
+    :return: (normalized dept, normalized course number, topic title) keys and the matching histograms
+    :rtype: tuple(list[tuple], numpy.ndarray)
+    """
+    topic_titles = load_topic_titles()
+    keys, histograms = load_histograms(['dept', 'course_nbr', 'course_name'])
+
+    # index of the topic of every course name, -1 for course names matching no topic
+    topic_groups = {}
+    group_ids = np.full(len(keys), -1, dtype=np.intp)
+    for i, (dept, course_nbr, course_name) in enumerate(keys):
+        topic_title = match_topic_title(course_name, topic_titles.get((dept, course_nbr), []))
+        if len(topic_title) > 0:
+            group_ids[i] = topic_groups.setdefault((dept, course_nbr, topic_title), len(topic_groups))
+
+    matched = group_ids >= 0
+    sums = np.zeros((len(topic_groups), len(GRADE_KEYS)), dtype=np.int64)
+    np.add.at(sums, group_ids[matched], histograms[matched])
+    return list(topic_groups), sums
+
+
+def median_grades(histograms):
+    """
+    Get the median grade of every histogram at once.
+    The cumulative counts of all histograms are laid end to end (each row shifted past the previous one)
+    so a single searchsorted finds the first grade whose cumulative count passes the median of its row
+    :param histograms: one row of twelve counts in GRADE_KEYS order per histogram
+    :type histograms: numpy.ndarray
+    :return: median grade of every histogram, None for empty histograms
+    :rtype: list[str or None]
+    """
+    if len(histograms) == 0:
+        return []
+
+    cumulative = np.cumsum(histograms, axis=1)
+    totals = cumulative[:, -1]
+    median_index = totals // 2
+
+    offsets = np.concatenate(([0], np.cumsum(totals + 1)[:-1]))
+    positions = np.searchsorted((cumulative + offsets[:, None]).ravel(), median_index + offsets, side='right')
+    grade_index = positions - np.arange(len(histograms)) * len(GRADE_KEYS)
+
+    return [GRADE_KEYS[index] if total > 0 else None for index, total in zip(grade_index, totals)]
@@ -0,0 +1,115 @@
+from collections import defaultdict
+
+from utreview.services.catalog import versioned_cache
+from utreview.services.logger import logger
+
+
+"""
+This .py file contains an in-memory n-gram index used to find course codes and prof names containing a substring.
+"""
+
+
+def normalize_key(text):
+    """
+    Normalize text for substring matching (lowercase, no spaces)
+    :param text: text to normalize
+    :type text: str
+    :return: normalized text
+    :rtype: str
+    """
+    return text.lower().replace(" ", "")
+
+
+class NgramIndex:
+    """
+    Class mapping every n-gram (of length 1 to n) of a set of keys to the ids containing it.
+    Substring queries intersect the posting lists of the query's n-grams instead of scanning every key.
+    """
+
+    def __init__(self, n=3):
+        """
+        initialize an empty index
+        :param n: longest n-gram length to index
+        :type n: int
+        """
+        self.n = n
+        self.keys = {}
+        self.postings = defaultdict(set)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key_id, key):
+        """
+        Add a key to the index
+        :param key_id: id the key belongs to
+        :type key_id: int
+        :param key: normalized key
+        :type key: str
+        """
+        self.keys[key_id] = key
+        for size in range(1, self.n + 1):
+            for i in range(len(key) - size + 1):
+                self.postings[key[i:i + size]].add(key_id)
+
+    def search(self, substring):
+        """
+        Find the ids whose key contains the substring
+        :param substring: normalized substring to search for
+        :type substring: str
+        :return: ids containing the substring in increasing order
+        :rtype: list[int]
+        """
+        if len(substring) == 0:
+            return []
+
+        # short queries are n-grams themselves
+        if len(substring) <= self.n:
+            return sorted(self.postings.get(substring, ()))
+
+        grams = {substring[i:i + self.n] for i in range(len(substring) - self.n + 1)}
+        posting_lists = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+        if len(posting_lists[0]) == 0:
+            return []
+
+        # n-grams can match out of order, so verify the smaller candidate set
+        candidates = set.intersection(*posting_lists)
+        return sorted(key_id for key_id in candidates if substring in self.keys[key_id])
+
+
+def build_catalog_ngrams():
+    """
+    Build n-gram indexes of the course codes (dept abbreviation + number) and prof names in the database
+    :return: course index and prof index
+    :rtype: tuple(NgramIndex, NgramIndex)
+    """
+    from utreview import db
+    from utreview.models.course import Course
+    from utreview.models.others import Dept
+    from utreview.models.prof import Prof
+
+    course_ngrams = NgramIndex()
+    course_rows = db.session.query(Course.id, Dept.abr, Course.num) \
+        .join(Dept, Course.dept_id == Dept.id) \
+        .filter(Course.topic_num <= 0)
+    for course_id, abr, num in course_rows:
+        course_ngrams.add(course_id, normalize_key(abr + num))
+
+    prof_ngrams = NgramIndex()
+    for prof_id, first_name, last_name in db.session.query(Prof.id, Prof.first_name, Prof.last_name):
+        prof_ngrams.add(prof_id, normalize_key(first_name + last_name))
+
+    logger.info(f"Built search n-gram indexes: {len(course_ngrams)} courses, {len(prof_ngrams)} profs")
+    return course_ngrams, prof_ngrams
+
+
+__catalog_ngrams = versioned_cache(build_catalog_ngrams)
+
+
+def get_catalog_ngrams():
+    """
+    Get the catalog n-gram indexes, rebuilding them if the catalog changed since they were built
+    :return: course index and prof index
+    :rtype: tuple(NgramIndex, NgramIndex)
+    """
+    return __catalog_ngrams()
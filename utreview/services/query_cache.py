@@ -0,0 +1,96 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+
+"""
+This .py file contains a bounded, thread safe LRU cache with expiring entries used for search results.
+"""
+
+
+class QueryCache:
+    """
+    Class implementing an LRU cache whose entries also expire after ttl seconds.
+    Callers put everything the result depends on (index generations, catalog version) in the key,
+    so stale entries are never hit and simply age out of the cache.
+    """
+
+    def __init__(self, max_size, ttl):
+        """
+        initialize an empty cache
+        :param max_size: max number of entries, 0 disables the cache
+        :type max_size: int
+        :param ttl: seconds an entry stays valid
+        :type ttl: float
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get the value cached for a key
+        :param key: cache key
+        :type key: hashable
+        :return: cached value, None if the key is missing or expired
+        :rtype: object
+        """
+        with self.__lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """
+        Cache a value, evicting the least recently used entries if the cache is full
+        :param key: cache key
+        :type key: hashable
+        :param value: value to cache, must not be None
+        :type value: object
+        """
+        if self.max_size <= 0:
+            return
+
+        with self.__lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Remove every entry
+        """
+        with self.__lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        Get the cache counters
+        :return: size, limits, hits, misses, evictions and hit rate
+        :rtype: dict
+        """
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxSize': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRate': self.hits / lookups if lookups > 0 else None
+            }
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+"""
+This .py file contains the ranking stage for search results.
+Text relevance is blended with the rating signals stored on courses/profs in one vectorized computation.
+"""
+
+
+# weights of the blended score
+TEXT_WEIGHT = 0.6
+POPULARITY_WEIGHT = 0.2
+APPROVAL_WEIGHT = 0.12
+ECIS_WEIGHT = 0.08
+
+# number of neutral ratings the approval is shrunk towards, so one 100% rating does not beat fifty 95% ratings
+APPROVAL_PRIOR_RATINGS = 5
+NEUTRAL_SCORE = 0.5
+
+# max number of results kept per entity type
+SEARCH_TOP_K = 100
+
+
+def rank_ids(model, ids, top_k=None):
+    """
+    Reorder search result ids by blending their text relevance with their rating signals
+    :param model: Course or Prof
+    :type model: model class
+    :param ids: result ids in text relevance order
+    :type ids: list[int]
+    :param top_k: max number of ids to return, None to keep all of them
+    :type top_k: int
+    :return: ids in ranked order
+    :rtype: list[int]
+    """
+    from utreview import db
+
+    if len(ids) == 0:
+        return []
+
+    # fetch the signals of every candidate in one column query
+    signals = {
+        row[0]: row[1:] for row in
+        db.session.query(model.id, model.num_ratings, model.approval, model.ecis_avg).filter(model.id.in_(ids))
+    }
+    values = np.array([signals.get(result_id, (None, None, None)) for result_id in ids], dtype=np.float64)
+    num_ratings = np.nan_to_num(values[:, 0], nan=0.0)
+    approval = values[:, 1]
+    ecis = values[:, 2]
+
+    # text relevance decays with the position in the text ranking
+    text = 1 / np.log2(np.arange(len(ids)) + 2)
+
+    popularity = np.log1p(num_ratings)
+    if popularity.max() > 0:
+        popularity /= popularity.max()
+
+    approval = np.where(np.isnan(approval), NEUTRAL_SCORE, approval)
+    approval = (approval * num_ratings + NEUTRAL_SCORE * APPROVAL_PRIOR_RATINGS) / \
+        (num_ratings + APPROVAL_PRIOR_RATINGS)
+
+    # ecis scores are on a 1 to 5 scale
+    ecis = np.where(np.isnan(ecis), NEUTRAL_SCORE, (ecis - 1) / 4)
+
+    score = TEXT_WEIGHT * text + POPULARITY_WEIGHT * popularity + APPROVAL_WEIGHT * approval + ECIS_WEIGHT * ecis
+    order = np.argsort(-score, kind='stable')
+    if top_k is not None:
+        order = order[:top_k]
+
+    return [ids[i] for i in order]
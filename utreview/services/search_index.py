@@ -0,0 +1,292 @@
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+from whoosh.fields import Schema, ID, TEXT
+from whoosh.index import create_in, exists_in, open_dir
+from whoosh.writing import AsyncWriter
+
+from utreview.services.logger import logger
+
+
+"""
+This .py file contains functions for opening and updating the whoosh search indexes for courses and profs.
+"""
+
+
+COURSE_IX_DIR = "utreview/index/course"
+PROF_IX_DIR = "utreview/index/prof"
+
+# rows fetched per round trip when streaming documents from the database
+STREAM_BATCH_SIZE = 2000
+
+
+def build_schema():
+    """
+    Build the schema shared by the course and prof indexes.
+    The index field is unique so documents can be replaced with update_document.
+    :return: schema for a search index
+    :rtype: Schema
+    """
+    return Schema(index=ID(stored=True, unique=True), content=TEXT)
+
+
+def course_content(course):
+    """
+    Build the searchable content for a course
+    :param course: course to index
+    :type course: Course
+    :return: content string for the course document
+    :rtype: str
+    """
+    dept = course.dept
+    return " ".join([dept.abr, dept.name, course.num, course.title])
+
+
+def prof_content(prof):
+    """
+    Build the searchable content for a prof
+    :param prof: prof to index
+    :type prof: Prof
+    :return: content string for the prof document
+    :rtype: str
+    """
+    return " ".join([prof.first_name, prof.last_name])
+
+
+def open_or_create_ix(ix_dir, populate):
+    """
+    Open the index in the given directory if it exists, otherwise create it and fill it with populate.
+    Indexes created before the index field was unique are rebuilt since they cannot be updated in place.
+    :param ix_dir: directory of the index
+    :type ix_dir: str
+    :param populate: function taking the new index and adding every document to it
+    :type populate: function
+    :return: opened index
+    :rtype: FileIndex
+    """
+    if exists_in(ix_dir):
+        ix = open_dir(ix_dir)
+        if ix.schema["index"].unique:
+            return ix
+        logger.info(f"Search index at {ix_dir} has an outdated schema. Rebuilding...")
+
+    if not os.path.isdir(ix_dir):
+        os.makedirs(ix_dir)
+
+    logger.info(f"Creating search index at {ix_dir}")
+    ix = create_in(ix_dir, build_schema())
+    populate(ix)
+    return ix
+
+
+def course_documents():
+    """
+    Stream the documents of every course in the database with a server side cursor.
+    The content is built from the same columns as course_content
+    :return: generator of (index, content) pairs
+    :rtype: generator
+    """
+    from utreview import db
+    from utreview.models.course import Course
+    from utreview.models.others import Dept
+
+    rows = db.session.query(Course.id, Dept.abr, Dept.name, Course.num, Course.title) \
+        .join(Dept, Course.dept_id == Dept.id) \
+        .yield_per(STREAM_BATCH_SIZE)
+    for course_id, abr, name, num, title in rows:
+        yield str(course_id), " ".join([abr, name, num, title])
+
+
+def prof_documents():
+    """
+    Stream the documents of every prof in the database with a server side cursor.
+    The content is built from the same columns as prof_content
+    :return: generator of (index, content) pairs
+    :rtype: generator
+    """
+    from utreview import db
+    from utreview.models.prof import Prof
+
+    rows = db.session.query(Prof.id, Prof.first_name, Prof.last_name).yield_per(STREAM_BATCH_SIZE)
+    for prof_id, first_name, last_name in rows:
+        yield str(prof_id), " ".join([first_name, last_name])
+
+
+def write_documents(writer, documents):
+    """
+    Add documents to an index writer and commit them
+    :param writer: writer of the index
+    :type writer: IndexWriter
+    :param documents: (index, content) pairs
+    :type documents: iterable[tuple(str, str)]
+    :return: number of documents written
+    :rtype: int
+    """
+    num_docs = 0
+    for index, content in documents:
+        writer.add_document(index=index, content=content)
+        num_docs += 1
+    writer.commit()
+    return num_docs
+
+
+def populate_course_ix(ix):
+    """
+    Add every course in the database to the given index
+    :param ix: index to add the courses to
+    :type ix: FileIndex
+    """
+    write_documents(ix.writer(), course_documents())
+
+
+def populate_prof_ix(ix):
+    """
+    Add every prof in the database to the given index
+    :param ix: index to add the profs to
+    :type ix: FileIndex
+    """
+    write_documents(ix.writer(), prof_documents())
+
+
+def rebuild_ix(ix_dir, documents, procs=None, limitmb=256):
+    """
+    Build a fresh index next to ix_dir with whoosh's multiprocessing writer and swap it in atomically.
+    ix_dir becomes a symlink to the latest build, so open indexes pick up the new files on their next search.
+    :param ix_dir: directory of the live index
+    :type ix_dir: str
+    :param documents: generator of (index, content) pairs
+    :type documents: generator
+    :param procs: number of writer processes, defaults to the number of cpus
+    :type procs: int
+    :param limitmb: memory limit of each writer process in MB
+    :type limitmb: int
+    :return: timing report of the build
+    :rtype: str
+    """
+    procs = procs or os.cpu_count() or 1
+    # unique build directory, even for rebuilds started within the same second
+    build_dir = tempfile.mkdtemp(prefix=f"{os.path.basename(ix_dir)}.{time.strftime('%Y%m%d%H%M%S')}.",
+                                 dir=os.path.dirname(ix_dir))
+
+    start = time.time()
+    ix = create_in(build_dir, build_schema())
+    if procs > 1:
+        # each process writes its own segment, skipping the final merge
+        writer = ix.writer(procs=procs, limitmb=limitmb, multisegment=True)
+    else:
+        writer = ix.writer(limitmb=limitmb)
+    num_docs = write_documents(writer, documents)
+    elapsed = time.time() - start
+
+    report = f"Rebuilt search index {ix_dir}: {num_docs} docs in {elapsed:.2f}s " \
+             f"({num_docs / elapsed if elapsed > 0 else 0:.0f} docs/sec, {procs} procs)"
+    logger.info(report)
+
+    swap_ix_dir(ix_dir, build_dir)
+    return report
+
+
+def swap_ix_dir(ix_dir, build_dir):
+    """
+    Point ix_dir to build_dir by atomically replacing the ix_dir symlink.
+    The previous build is kept for searches still reading it, older builds are removed.
+    :param ix_dir: directory of the live index
+    :type ix_dir: str
+    :param build_dir: directory of the new index, next to ix_dir
+    :type build_dir: str
+    """
+    keep = {os.path.abspath(build_dir)}
+
+    if os.path.islink(ix_dir):
+        keep.add(os.path.abspath(os.path.join(os.path.dirname(ix_dir), os.readlink(ix_dir))))
+    elif os.path.isdir(ix_dir):
+        # first swap: move the original directory out of the way so it can be replaced by a symlink
+        legacy_dir = f"{build_dir}.old"
+        os.rename(ix_dir, legacy_dir)
+        keep.add(os.path.abspath(legacy_dir))
+
+    link_path = f"{ix_dir}.{os.getpid()}.link"
+    os.symlink(os.path.basename(build_dir), link_path)
+    os.replace(link_path, ix_dir)
+    logger.info(f"Search index {ix_dir} now points to {build_dir}")
+
+    for old_dir in glob.glob(f"{ix_dir}.*"):
+        if os.path.isdir(old_dir) and not os.path.islink(old_dir) and os.path.abspath(old_dir) not in keep:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def rebuild_search_ixs(which="all", procs=None):
+    """
+    Rebuild the course and/or prof index from scratch and invalidate the cached search data
+    :param which: 'course', 'prof' or 'all'
+    :type which: str
+    :param procs: number of writer processes, defaults to the number of cpus
+    :type procs: int
+    :return: timing report of each index build and of the whole rebuild
+    :rtype: list[str]
+    """
+    from utreview.services.catalog import bump_catalog_version
+
+    start = time.time()
+    reports = []
+    if which in ("course", "all"):
+        reports.append(rebuild_ix(COURSE_IX_DIR, course_documents(), procs))
+    if which in ("prof", "all"):
+        reports.append(rebuild_ix(PROF_IX_DIR, prof_documents(), procs))
+
+    bump_catalog_version()
+
+    report = f"Rebuilt search indexes ({which}) in {time.time() - start:.2f}s"
+    logger.info(report)
+    reports.append(report)
+    return reports
+
+
+def update_course_ix(courses):
+    """
+    Add or replace the documents of the given courses in the course index
+    :param courses: courses that were added or renamed
+    :type courses: list[Course]
+    """
+    from utreview import course_ix
+
+    courses = [course for course in courses if course is not None and course.id is not None]
+    if len(courses) == 0:
+        return
+
+    logger.info(f"Updating course search index with {len(courses)} courses")
+    writer = AsyncWriter(course_ix)
+    for course in courses:
+        writer.update_document(index=str(course.id), content=course_content(course))
+    writer.commit()
+
+
+def update_prof_ix(profs):
+    """
+    Add or replace the documents of the given profs in the prof index
+    :param profs: profs that were added or renamed
+    :type profs: list[Prof]
+    """
+    from utreview import prof_ix
+
+    profs = [prof for prof in profs if prof is not None and prof.id is not None]
+    if len(profs) == 0:
+        return
+
+    logger.info(f"Updating prof search index with {len(profs)} profs")
+    writer = AsyncWriter(prof_ix)
+    for prof in profs:
+        writer.update_document(index=str(prof.id), content=prof_content(prof))
+    writer.commit()
+
+
+if __name__ == '__main__':
+    # offline rebuild: python -m utreview.services.search_index [course|prof|all] [procs]
+    import sys
+
+    reports = rebuild_search_ixs(sys.argv[1] if len(sys.argv) > 1 else "all",
+                                 int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    print("\n".join(reports))
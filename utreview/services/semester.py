@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+
+from utreview.services.fetch_ftp import key_current, key_next, key_future, sem_file
+from utreview.services.logger import logger
+
+
+"""
+This .py file contains the semester service holding the current, next and future semesters in memory.
+The values are read from the semester file written by fetch_sem_values and reloaded when the file is replaced,
+so updates from the backend pipeline reach every module and worker without reading the file on every request.
+"""
+
+
+SEMESTER_FILE = os.path.join("input_data", sem_file)
+
+# seconds between checks of the semester file for changes
+RELOAD_INTERVAL = 5
+
+SEMESTER_NAMES = {
+    2: "Spring",
+    6: "Summer",
+    9: "Fall"
+}
+
+__lock = threading.Lock()
+__semesters = {
+    'stat': None,
+    'checked': 0,
+    'values': {key_current: None, key_next: None, key_future: None}
+}
+
+
+def int_or_none(obj):
+    """
+    Convert a value to int
+    :param obj: value to convert
+    :type obj: str or int or None
+    :return: converted value, None if it cannot be converted
+    :rtype: int or None
+    """
+    try:
+        return int(obj)
+    except (ValueError, TypeError):
+        return None
+
+
+def reload_semesters(force=False):
+    """
+    Read the semester file again if it changed since it was last read
+    :param force: read the file even if it did not change
+    :type force: bool
+    """
+    try:
+        stat = os.stat(SEMESTER_FILE)
+    except FileNotFoundError:
+        logger.debug(f"Semester file {SEMESTER_FILE} does not exist")
+        return
+
+    stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if not force and stat_key == __semesters['stat']:
+        return
+
+    with __lock:
+        try:
+            with open(SEMESTER_FILE, 'r') as f:
+                sem_dict = json.load(f)
+        except ValueError:
+            # keep the previous values, the file will be checked again
+            logger.warning(f"Cannot parse semester file {SEMESTER_FILE}. Keeping previous semester values")
+            return
+
+        if sem_dict is not None:
+            __semesters['values'] = {key: int_or_none(sem_dict.get(key)) for key in (key_current, key_next, key_future)}
+        __semesters['stat'] = stat_key
+        logger.info(f"Loaded semester values: {__semesters['values']}")
+
+
+def get_semesters():
+    """
+    Get the current, next and future semesters (ex: 20209 for Fall 2020).
+    The semester file is checked for changes at most once every RELOAD_INTERVAL seconds
+    :return: mapping from 'current', 'next' and 'future' to the semester or None
+    :rtype: dict[str, int or None]
+    """
+    now = time.monotonic()
+    if now - __semesters['checked'] >= RELOAD_INTERVAL:
+        __semesters['checked'] = now
+        reload_semesters()
+
+    return __semesters['values']
+
+
+def current_semesters():
+    """
+    Get the current, next and future semesters
+    :return: current, next and future semester (ex: 20209 for Fall 2020) or None
+    :rtype: tuple(int or None, int or None, int or None)
+    """
+    semesters = get_semesters()
+    return semesters[key_current], semesters[key_next], semesters[key_future]
+
+
+def split_semester(semester):
+    """
+    Split a semester value into its year and semester
+    :param semester: semester (ex: 20209 for Fall 2020)
+    :type semester: int or None
+    :return: year and semester (2, 6 or 9), both None if semester is None
+    :rtype: tuple(int or None, int or None)
+    """
+    if semester is None:
+        return None, None
+    return semester // 10, semester % 10
+
+
+def following_semester(year, sem):
+    """
+    Get the semester following the given semester (Fall -> Spring -> Summer -> Fall)
+    :param year: year of the semester
+    :type year: int or None
+    :param sem: semester (2, 6 or 9)
+    :type sem: int or None
+    :return: year and semester of the following semester, both None if unknown
+    :rtype: tuple(int or None, int or None)
+    """
+    if year is None:
+        return None, None
+    if sem == 9:
+        return year + 1, 2
+    if sem == 2:
+        return year, 6
+    if sem == 6:
+        return year, 9
+    return None, None
+
+
+def semester_string(year, sem):
+    """
+    Get the display string of a semester
+    :param year: year of the semester
+    :type year: int or None
+    :param sem: semester (2, 6 or 9)
+    :type sem: int or None
+    :return: display string (ex: 'Fall 2020'), None if unknown
+    :rtype: str or None
+    """
+    if year is None or sem not in SEMESTER_NAMES:
+        return None
+    return f"{SEMESTER_NAMES[sem]} {year}"
+
+
+def schedule_semesters():
+    """
+    Get the semesters shown on the course/prof schedules: the current semester and the one following it
+    :return: current and following semester as {'year': year, 'sem': semester}
+    :rtype: tuple(dict, dict)
+    """
+    cur_year, cur_sem = split_semester(get_semesters()[key_current])
+    next_year, next_sem = following_semester(cur_year, cur_sem)
+    return {'year': cur_year, 'sem': cur_sem}, {'year': next_year, 'sem': next_sem}
@@ -0,0 +1,117 @@
+from utreview.services.catalog import versioned_cache
+from utreview.services.logger import logger
+
+
+"""
+This .py file contains the in-memory map of the topic hierarchy (parent topic course and topic courses of each topic).
+The map is built with one query and rebuilt when the catalog version changes (populate_course bumps it).
+"""
+
+
+class TopicMap:
+    """
+    Class mapping each topic to its parent topic course (topic_num == 0) and its topic courses (topic_num > 0)
+    """
+
+    def __init__(self):
+        """
+        initialize an empty map
+        """
+        self.topics = {}
+        self.course_topics = {}
+
+    def build(self, rows):
+        """
+        Build the map from the topic courses
+        :param rows: course id, topic id and topic number of every course with a topic
+        :type rows: iterable(tuple(int, int, int))
+        """
+        parents = {}
+        children = {}
+        course_topics = {}
+        for course_id, topic_id, topic_num in rows:
+            course_topics[course_id] = topic_id
+            if topic_num == 0:
+                parents[topic_id] = course_id
+            else:
+                children.setdefault(topic_id, []).append((topic_num, course_id))
+
+        self.topics = {
+            topic_id: (parents.get(topic_id), tuple(course_id for _, course_id in sorted(children.get(topic_id, []))))
+            for topic_id in set(parents) | set(children)
+        }
+        self.course_topics = course_topics
+
+    def parent_id(self, topic_id):
+        """
+        Get the parent topic course of a topic
+        :param topic_id: topic id
+        :type topic_id: int or None
+        :return: id of the parent topic course, None if the topic has none
+        :rtype: int or None
+        """
+        return self.topics.get(topic_id, (None, ()))[0]
+
+    def child_ids(self, topic_id):
+        """
+        Get the topic courses of a topic, excluding the parent topic course
+        :param topic_id: topic id
+        :type topic_id: int or None
+        :return: ids of the topic courses ordered by topic number
+        :rtype: tuple(int)
+        """
+        return self.topics.get(topic_id, (None, ()))[1]
+
+    def course_ids(self, topic_id):
+        """
+        Get every course of a topic
+        :param topic_id: topic id
+        :type topic_id: int or None
+        :return: id of the parent topic course (if any) followed by the ids of the topic courses
+        :rtype: list[int]
+        """
+        parent_id, child_ids = self.topics.get(topic_id, (None, ()))
+        return ([parent_id] if parent_id is not None else []) + list(child_ids)
+
+    def root_id(self, course_id):
+        """
+        Get the course shown for a course in course lists: its parent topic course if it is a topic course
+        :param course_id: course id
+        :type course_id: int
+        :return: id of the parent topic course, the course id itself if it has none
+        :rtype: int
+        """
+        parent_id = self.parent_id(self.course_topics.get(course_id))
+        return parent_id if parent_id is not None else course_id
+
+    def __len__(self):
+        return len(self.topics)
+
+
+def build_topic_map():
+    """
+    Build the topic map from the courses with a topic
+    :return: topic map
+    :rtype: TopicMap
+    """
+    from utreview import db
+    from utreview.models.course import Course
+
+    rows = db.session.query(Course.id, Course.topic_id, Course.topic_num).filter(Course.topic_id.isnot(None))
+    topic_map = TopicMap()
+    topic_map.build(rows)
+
+    logger.info(f"Built topic map: {len(topic_map)} topics")
+    return topic_map
+
+
+__catalog_topics = versioned_cache(build_topic_map)
+
+
+def get_topic_map():
+    """
+    Get the topic map, rebuilding it if the catalog changed since it was built
+    :return: topic map
+    :rtype: TopicMap
+    """
+    return __catalog_topics()